@@ -1,9 +1,23 @@
 # Modified 6interactive_labormarket.py
+#
+# Start-up is kept light for autoscaled workers: numpy, pandas and plotly are only imported by the code paths that
+# need them (charts, downsampling, data loading), and dashboards load from the snapshots build_assets.py writes.
+import hashlib
+import json
 import os
+from functools import lru_cache
+
 import dash
-from dash import dcc, html, callback, Input, Output, State
+from dash import dcc, html, callback, clientside_callback, Input, Output, State
 import dash_bootstrap_components as dbc
-import shutil
+from dash.exceptions import PreventUpdate
+
+import data_store
+from data_api import chart_series, register_data_api
+from figure_store import data_revision, load_chart, load_layout_snapshot
+from instrumentation import register_instrumentation, watch_cache
+from metrics import read_key_metrics
+from static_assets import register_static_assets
 
 # Source location
 html_dir = "assets"
@@ -14,11 +28,23 @@ assets_dir = "assets"
 # Initialize the app
 app = dash.Dash(__name__,
                 external_stylesheets=[dbc.themes.FLATLY],
+                suppress_callback_exceptions=True,  # dashboard components are rendered per URL
                 meta_tags=[{"name": "viewport", "content": "width=device-width, initial-scale=1"}])
 
 server = app.server  # Needed for deployment
+register_static_assets(app)
+register_instrumentation(app)
+register_data_api(app)
+
+
+# Health check for the load balancer; answered without touching the dashboards
+@server.route("/healthz")
+def healthz():
+    return {"status": "ok", "pid": os.getpid()}, 200, {"Cache-Control": "no-store"}
 
-# Define key metrics
+
+# Define key metrics for the default combination (fallback values, replaced by the KPIs computed from
+# data/model_output.* when present)
 key_metrics = {
     "initial_workforce": 4555,
     "final_workforce": 5071,
@@ -28,526 +54,698 @@ key_metrics = {
     "training_multiplier_needed": 2.84,
     "mobility_multiplier_needed": 3.21
 }
+key_metrics.update(read_key_metrics())
+
+# Dashboards kept built in memory, one per (region, SOC code)
+dashboard_cache_size = 32
+
+
+def combination_metrics(region, soc):
+    """Key metrics for a combination; only the default one falls back to the values above."""
+    if (region, soc) == (data_store.default_selection["region"], data_store.default_selection["soc"]):
+        return {**key_metrics, **data_store.key_metrics(region, soc)}
+    return data_store.key_metrics(region, soc)
+
+
+def format_metric(metrics, name, template="{:,}"):
+    value = metrics.get(name)
+    return "n/a" if value is None else template.format(value)
+
+
+def simulation_overrides(metrics):
+    """Simulation parameters taken from a combination's key metrics."""
+    return {name: metrics[name] for name in ("initial_workforce", "final_workforce") if name in metrics}
+
+# Chart names in the figure store, keyed by the id of the graph that displays them
+chart_sources = {
+    "central-viz": "central_visualization",
+    "scenario-forecasts": "scenario_forecasts",
+    "demand-breakdown": "demand_breakdown",
+    "demand-composition": "demand_composition",
+    "model-forecasts": "model_forecasts",
+    "employment-comparison": "employment_comparison",
+    "workforce_composition": "workforce_composition",
+    "enrollment-projections": "enrollment_projections",
+    "historical-projected-graduates": "historical_projected_graduates",
+    "completion_timing": "completion_timing",
+    "monthly-graduates": "monthly_graduates_stacked",
+    "job-clusters": "job_clusters_tsne",
+    "occupation-distribution": "occupation_distribution",
+    "skill-heatmap": "skill_heatmap",
+    "shortage-comparison": "shortage_comparison",
+    "time-variant-parameters": "time_variant_parameters",
+    "matching-efficiency": "matching_efficiency",
+}
+
+# Charts shown in each tab, keyed by the Tabs id and then the tab_id
+tab_charts = {
+    "demand-tabs": {
+        "tab-scenario": ["scenario-forecasts"],
+        "tab-components": ["demand-breakdown"],
+        "tab-composition": ["demand-composition"],
+        "tab-model": ["model-forecasts"],
+    },
+    "supply-tabs": {
+        "tab-employment": ["employment-comparison"],
+        "tab-workforce": ["workforce_composition"],
+        "tab-enrollment": ["enrollment-projections", "historical-projected-graduates"],
+        "tab-completion": ["completion_timing"],
+        "tab-patterns": ["monthly-graduates"],
+    },
+    "jobs-tabs": {
+        "tab-clusters": ["job-clusters"],
+        "tab-occupation": ["occupation-distribution"],
+        "tab-skills": ["skill-heatmap"],
+    },
+    "shortage-tabs": {
+        "tab-shortage": ["shortage-comparison"],
+        "tab-parameters": ["time-variant-parameters", "matching-efficiency"],
+    },
+}
+
+# Deferred loading: tabbed charts get their figure only once their tab is opened (set LAZY_CHARTS=0 to load all up front)
+lazy_charts = os.environ.get("LAZY_CHARTS", "1") != "0"
+tabbed_charts = {frame_id for tabs in tab_charts.values() for frames in tabs.values() for frame_id in frames}
+
+# Dense charts served downsampled to the viewport width; zooming in fetches full detail for the visible range
+downsampled_charts = {"scenario-forecasts", "time-variant-parameters", "matching-efficiency", "job-clusters"}
+
+# Charts drawn with WebGL traces once they grow past downsample.webgl_threshold points
+webgl_charts = {"job-clusters", "skill-heatmap"}
+
+# Browser-side figure cache: tabs opened again in the same browser tab (after a reload, or coming back from another
+# dashboard) are filled from sessionStorage instead of the server; least recently used figures are evicted past
+# these limits (characters of figure JSON, kept under the ~5 MB sessionStorage quota, and figures)
+figure_cache_chars = 3_000_000
+figure_cache_entries = 40
+
 
-# Define the app layout
-app.layout = dbc.Container([
-    # Navigation bar
-    dbc.Navbar(
-        dbc.Container([
-            html.A(
-                dbc.Row([
-                    dbc.Col(dbc.NavbarBrand("Industrial Machinery Mechanics Forecast", className="ms-2")),
-                ],
-                    align="center",
-                    className="g-0",
+def chart_figure(frame_id, region, soc, viewport_width=None, x_range=None, y_range=None):
+    from downsample import downsample_figure, webgl_figure
+
+    figure = load_chart(chart_sources[frame_id], region, soc)
+    if frame_id in webgl_charts:
+        figure = webgl_figure(figure)
+    if frame_id not in downsampled_charts:
+        return figure
+    return downsample_figure(figure, viewport_width, x_range, y_range, uirevision=frame_id)
+
+
+def chart_graph(frame_id, region, soc, height="500px"):
+    deferred = lazy_charts and frame_id in tabbed_charts
+    return dcc.Graph(
+        id=frame_id,
+        figure=None if deferred else chart_figure(frame_id, region, soc),
+        style={"width": "100%", "height": height},
+    )
+
+
+def tab_stores(tabs_id):
+    """Lazy-loading state of one Tabs: tabs loaded so far, the tab asked of the server and the server's reply."""
+    return [dcc.Store(id=f"{tabs_id}-loaded", data=[]), dcc.Store(id=f"{tabs_id}-request"),
+            dcc.Store(id=f"{tabs_id}-figures")]
+
+
+# Define the dashboard layout for one (region, SOC code) combination (cached by dashboard_layout)
+def build_dashboard(region, soc):
+    selection = data_store.selection(region, soc)
+    occupation, region_name = selection["occupation_name"], selection["region_name"]
+    metrics = combination_metrics(region, soc)
+    return dbc.Container([
+        # Navigation bar
+        dbc.Navbar(
+            dbc.Container([
+                html.A(
+                    dbc.Row([
+                        dbc.Col(dbc.NavbarBrand(f"{occupation} Forecast", className="ms-2")),
+                    ],
+                        align="center",
+                        className="g-0",
+                    ),
+                    href="#",
+                    style={"textDecoration": "none"},
                 ),
-                href="#",
-                style={"textDecoration": "none"},
-            ),
-            dbc.NavbarToggler(id="navbar-toggler", n_clicks=0),
-            dbc.Collapse(
-                dbc.Nav([
-                    dbc.NavItem(html.A("Executive Summary", href="#summary", className="nav-link")),
-                    dbc.NavItem(html.A("Demand Analysis", href="#demand", className="nav-link")),
-                    dbc.NavItem(html.A("Supply Analysis", href="#supply", className="nav-link")),
-                    dbc.NavItem(html.A("Job Evolution", href="#jobs", className="nav-link")),
-                    dbc.NavItem(html.A("Shortage Projections", href="#shortage", className="nav-link")),
-                ], className="ms-auto", navbar=True),
-                id="navbar-collapse",
-                navbar=True,
-            ),
+                dbc.NavbarToggler(id="navbar-toggler", n_clicks=0),
+                dbc.Collapse(
+                    dbc.Nav([
+                        dbc.NavItem(html.A("Executive Summary", href="#summary", className="nav-link")),
+                        dbc.NavItem(html.A("Demand Analysis", href="#demand", className="nav-link")),
+                        dbc.NavItem(html.A("Supply Analysis", href="#supply", className="nav-link")),
+                        dbc.NavItem(html.A("Job Evolution", href="#jobs", className="nav-link")),
+                        dbc.NavItem(html.A("Shortage Projections", href="#shortage", className="nav-link")),
+                    ], className="ms-auto", navbar=True),
+                    id="navbar-collapse",
+                    navbar=True,
+                ),
+            ]),
+            color="primary",
+            dark=True,
+            className="mb-4 sticky-top",
+        ),
+
+        # Intro Panel
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H2(f"{occupation} Workforce Forecast (2025-2030)", className="text-primary"),
+                    html.P(f"Predicting workforce shortages in the {region_name} region using supply-demand labor market modeling",
+                           className="lead"),
+                    html.P([
+                        f"This dashboard presents the projected workforce shortages for {occupation} in {region_name}, utilizing ",
+                        html.Strong("dual-pool modeling"),
+                        " to track both employed workers and the available pool of qualified candidates."
+                    ]),
+                    html.Hr(),
+                ], className="p-3 bg-light rounded")
+            ], width=12)
+        ], className="mb-4"),
+
+        # ==================================== SECTION 1: EXECUTIVE SUMMARY ====================================
+        dbc.Row([
+            dbc.Col([
+                html.H3("Executive Summary", id="summary", className="mb-3 section-header"),
+                html.P(
+                    "Projected workforce shortages driven by aging workforce, insufficient training pipeline capacity, and significant turnover",
+                    className="text-muted"),
+            ], width=12)
+        ], className="mb-3"),
+
+        dbc.Row([
+            # Key metrics cards
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5("Current Workforce (2025)", className="card-title"),
+                        html.H2(format_metric(metrics, "initial_workforce"), className="text-primary"),
+                        html.P("NC Commerce Official Projection", className="text-muted"),
+                    ])
+                ], className="h-100"),
+            ], width=12, md=3, className="mb-4"),
+
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5("Projected Workforce (2030)", className="card-title"),
+                        html.H2(format_metric(metrics, "final_workforce"), className="text-primary"),
+                        html.P("NC Commerce Official Projection", className="text-muted"),
+                    ])
+                ], className="h-100"),
+            ], width=12, md=3, className="mb-4"),
+
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5("Average Monthly Shortages", className="card-title"),
+                        html.H2(format_metric(metrics, "avg_monthly_shortage"), className="text-danger"),
+                        html.P(f"Forecasted positions remaining vacant each month", className="text-muted"),
+                    ])
+                ], className="h-100"),
+            ], width=12, md=3, className="mb-4"),
+
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5("Cumulative Shortage", className="card-title"),
+                        html.H2(format_metric(metrics, "total_cumulative_shortage"), className="text-danger"),
+                        html.P(f"Forecasted unfilled positions over 5-year period", className = 'text-muted'),
+                    ])
+                ], className="h-100"),
+            ], width=12, md=3, className="mb-4"),
         ]),
-        color="primary",
-        dark=True,
-        className="mb-4 sticky-top",
-    ),
-
-    # Intro Panel
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H2("Industrial Machinery Mechanics Workforce Forecast (2025-2030)", className="text-primary"),
-                html.P("Predicting workforce shortages in the Charlotte region using supply-demand labor market modeling",
-                       className="lead"),
-                html.P([
-                    "This dashboard presents the projected workforce shortages for Industrial Machinery Mechanics in Charlotte, utilizing ",
-                    html.Strong("dual-pool modeling"),
-                    " to track both employed workers and the available pool of qualified candidates."
-                ]),
-                html.Hr(),
-            ], className="p-3 bg-light rounded")
-        ], width=12)
-    ], className="mb-4"),
-
-    # ==================================== SECTION 1: EXECUTIVE SUMMARY ====================================
-    dbc.Row([
-        dbc.Col([
-            html.H3("Executive Summary", id="summary", className="mb-3 section-header"),
-            html.P(
-                "Projected workforce shortages driven by aging workforce, insufficient training pipeline capacity, and significant turnover",
-                className="text-muted"),
-        ], width=12)
-    ], className="mb-3"),
-
-    dbc.Row([
-        # Key metrics cards
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H5("Current Workforce (2025)", className="card-title"),
-                    html.H2(f"{key_metrics['initial_workforce']:,}", className="text-primary"),
-                    html.P("NC Commerce Official Projection", className="text-muted"),
-                ])
-            ], className="h-100"),
-        ], width=12, md=3, className="mb-4"),
-
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H5("Projected Workforce (2030)", className="card-title"),
-                    html.H2(f"{key_metrics['final_workforce']:,}", className="text-primary"),
-                    html.P("NC Commerce Official Projection", className="text-muted"),
-                ])
-            ], className="h-100"),
-        ], width=12, md=3, className="mb-4"),
-
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H5("Average Monthly Shortages", className="card-title"),
-                    html.H2(f"{key_metrics['avg_monthly_shortage']:,}", className="text-danger"),
-                    html.P(f"Forecasted positions remaining vacant each month", className="text-muted"),
-                ])
-            ], className="h-100"),
-        ], width=12, md=3, className="mb-4"),
-
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H5("Cumulative Shortage", className="card-title"),
-                    html.H2(f"{key_metrics['total_cumulative_shortage']:,}", className="text-danger"),
-                    html.P(f"Forecasted unfilled positions over 5-year period", className = 'text-muted'),
-                ])
-            ], className="h-100"),
-        ], width=12, md=3, className="mb-4"),
-    ]),
-
-    # Central visualization
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H5("Supply-Demand-Shortage Synthesis", className="card-title")),
-                dbc.CardBody([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="central-viz",
-                            src="/assets/central_visualization.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+
+        # Central visualization
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H5("Supply-Demand-Shortage Synthesis", className="card-title")),
+                    dbc.CardBody([
+                        dcc.Loading(
+                            chart_graph("central-viz", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "The Industrial Machinery Mechanics workforce in Charlotte faces significant shortages through 2030, driven by high replacement demand (80% of openings from transfers and exits) and insufficient training pipeline capacity."
-                        ], className="mt-3")
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                f"The {occupation} workforce in {region_name} faces significant shortages through 2030, driven by high replacement demand (80% of openings from transfers and exits) and insufficient training pipeline capacity."
+                            ], className="mt-3")
+                        ])
                     ])
                 ])
-            ])
-        ], width=12)
-    ], className="mb-4"),
-
-    # Solutions summary
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H5("Addressing the Shortage", className="card-title")),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.H6("Training Pipeline Expansion", className="mb-3"),
-                            html.P([
-                                "Increasing training capacity by ",
-                                html.Strong(f"{key_metrics['training_multiplier_needed']}x"),
-                                " would close the shortage gap by 2030"
-                            ]),
-                            html.A("View Training Analysis", href="#supply",
-                                  className="btn btn-outline-primary btn-sm mt-2")
-                        ], width=12, md=4),
-
-                        dbc.Col([
-                            html.H6("Career Mobility Enhancement", className="mb-3"),
-                            html.P([
-                                "Increasing mobility inflows by ",
-                                html.Strong(f"{key_metrics['mobility_multiplier_needed']}x"),
-                                " from similar occupations would close the shortage gap"
-                            ]),
-                            html.A("View Mobility Analysis", href="#supply",
-                                  className="btn btn-outline-primary btn-sm mt-2")
-                        ], width=12, md=4),
-
-                        dbc.Col([
-                            html.H6("Matching Efficiency Improvement", className="mb-3"),
-                            html.P([
-                                "Improving the match between workforce supply and demand would invariably reduce shortages through better placement services"
-                            ]),
-                            html.A("View Matching Analysis", href="#shortage",
-                                  className="btn btn-outline-primary btn-sm mt-2")
-                        ], width=12, md=4),
+            ], width=12)
+        ], className="mb-4"),
+
+        # Solutions summary
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H5("Addressing the Shortage", className="card-title")),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                html.H6("Training Pipeline Expansion", className="mb-3"),
+                                html.P([
+                                    "Increasing training capacity by ",
+                                    html.Strong(format_metric(metrics, "training_multiplier_needed", "{}x")),
+                                    " would close the shortage gap by 2030"
+                                ]),
+                                html.A("View Training Analysis", href="#supply",
+                                      className="btn btn-outline-primary btn-sm mt-2")
+                            ], width=12, md=4),
+
+                            dbc.Col([
+                                html.H6("Career Mobility Enhancement", className="mb-3"),
+                                html.P([
+                                    "Increasing mobility inflows by ",
+                                    html.Strong(format_metric(metrics, "mobility_multiplier_needed", "{}x")),
+                                    " from similar occupations would close the shortage gap"
+                                ]),
+                                html.A("View Mobility Analysis", href="#supply",
+                                      className="btn btn-outline-primary btn-sm mt-2")
+                            ], width=12, md=4),
+
+                            dbc.Col([
+                                html.H6("Matching Efficiency Improvement", className="mb-3"),
+                                html.P([
+                                    "Improving the match between workforce supply and demand would invariably reduce shortages through better placement services"
+                                ]),
+                                html.A("View Matching Analysis", href="#shortage",
+                                      className="btn btn-outline-primary btn-sm mt-2")
+                            ], width=12, md=4),
+                        ])
                     ])
                 ])
-            ])
-        ], width=12)
-    ], className="mb-5"),
-
-    # ==================================== SECTION 2: DEMAND ANALYSIS ====================================
-    dbc.Row([
-        dbc.Col([
-            html.H3("Demand Analysis", id="demand", className="mb-3 section-header"),
-            html.P(
-                "Job posting forecasts and composition analysis for Industrial Machinery Mechanics in Charlotte region",
-                className="text-muted"),
-        ], width=12)
-    ], className="mb-3"),
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Tabs([
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="scenario-forecasts",
-                            src="/assets/scenario_forecasts.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+            ], width=12)
+        ], className="mb-5"),
+
+        # ==================================== SECTION 2: DEMAND ANALYSIS ====================================
+        dbc.Row([
+            dbc.Col([
+                html.H3("Demand Analysis", id="demand", className="mb-3 section-header"),
+                html.P(
+                    f"Job posting forecasts and composition analysis for {occupation} in {region_name} region",
+                    className="text-muted"),
+            ], width=12)
+        ], className="mb-3"),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Tabs([
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("scenario-forecasts", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Baseline projections show a steady demand for Industrial Machinery Mechanics, with monthly job postings ranging from 50-70 positions through 2030."
-                        ], className="mt-3")
-                    ])
-                ], label="Scenario Forecasts", tab_id="tab-scenario"),
-
-                dbc.Tab([
-                    dcc.Loading(id="loading-demand-breakdown", children=[
-                        html.Iframe(
-                            id="demand-breakdown",
-                            src="/assets/demand_breakdown.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
-                        )
-                    ], type="circle"),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Replacement demand (exits and transfers) represents over 80% of total demand, highlighting the impact of an aging and mobile workforce."
-                        ], className="mt-3")
-                    ])
-                ], label="Demand Components", tab_id="tab-components"),
-
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="demand-composition",
-                            src="/assets/demand_composition.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                f"Baseline projections show a steady demand for {occupation}, with monthly job postings ranging from 50-70 positions through 2030."
+                            ], className="mt-3")
+                        ])
+                    ], label="Scenario Forecasts", tab_id="tab-scenario"),
+
+                    dbc.Tab([
+                        dcc.Loading(id="loading-demand-breakdown", children=[
+                            chart_graph("demand-breakdown", region, soc)
+                        ], type="circle"),
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Replacement demand (exits and transfers) represents over 80% of total demand, highlighting the impact of an aging and mobile workforce."
+                            ], className="mt-3")
+                        ])
+                    ], label="Demand Components", tab_id="tab-components"),
+
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("demand-composition", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Only 20% of demand comes from workforce growth, while 32.8% is from workforce exits (retirement) and 47.3% from occupational transfers."
-                        ], className="mt-3")
-                    ])
-                ], label="Demand Composition", tab_id="tab-composition"),
-
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="model-forecasts",
-                            src="/assets/model_forecasts.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Only 20% of demand comes from workforce growth, while 32.8% is from workforce exits (retirement) and 47.3% from occupational transfers."
+                            ], className="mt-3")
+                        ])
+                    ], label="Demand Composition", tab_id="tab-composition"),
+
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("model-forecasts", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Methodological Note: "),
-                            "A hybrid SARIMAX/Prophet ensemble with time-varying weights provides optimal forecast accuracy, accounting for both short-term patterns and long-term structural factors."
-                        ], className="mt-3")
-                    ])
-                ], label="Model Comparison", tab_id="tab-model"),
-            ], id="demand-tabs", active_tab="tab-scenario")
-        ], width=12)
-    ], className="mb-5"),
-
-    # ==================================== SECTION 3: SUPPLY ANALYSIS ====================================
-    dbc.Row([
-        dbc.Col([
-            html.H3("Workforce Supply Analysis", id="supply", className="mb-3 section-header"),
-            html.P("Training pipeline capacity and workforce flow analysis for Industrial Machinery Mechanics",
-                   className="text-muted"),
-        ], width=12)
-    ], className="mb-3"),
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Tabs([
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="employment-comparison",
-                            src="/assets/employment_comparison.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Methodological Note: "),
+                                "A hybrid SARIMAX/Prophet ensemble with time-varying weights provides optimal forecast accuracy, accounting for both short-term patterns and long-term structural factors."
+                            ], className="mt-3")
+                        ])
+                    ], label="Model Comparison", tab_id="tab-model"),
+                ], id="demand-tabs", active_tab="tab-scenario"),
+                *tab_stores("demand-tabs"),
+            ], width=12)
+        ], className="mb-5"),
+
+        # ==================================== SECTION 3: SUPPLY ANALYSIS ====================================
+        dbc.Row([
+            dbc.Col([
+                html.H3("Workforce Supply Analysis", id="supply", className="mb-3 section-header"),
+                html.P(f"Training pipeline capacity and workforce flow analysis for {occupation}",
+                       className="text-muted"),
+            ], width=12)
+        ], className="mb-3"),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Tabs([
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("employment-comparison", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Without intervention, the employed workforce will fall significantly short of NC Commerce projections, creating persistent shortages."
-                        ], className="mt-3")
-                    ])
-                ], label="Employment Trajectory", tab_id="tab-employment"),
-
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="workforce_composition",
-                            src="/assets/workforce_composition.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Without intervention, the employed workforce will fall significantly short of NC Commerce projections, creating persistent shortages."
+                            ], className="mt-3")
+                        ])
+                    ], label="Employment Trajectory", tab_id="tab-employment"),
+
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("workforce_composition", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Mobility outflows are particularly strong, with retirements making up the largest portion of separations. Mobility inflows are taken form the pool of workers from the 10 most similar occupations (as defined by O*NET) and their respective mobility rates, which contribute to an available pool of workers. Retirement distributions from 2024 distribution show a mid-heavy, noting the value of technical expertise in this occupation and low younger entrants. Age distribution for this occupation comes from the latest IPUMS data in North Carolina."
-                        ], className="mt-3")
-                    ])
-                ], label="Workforce Composition", tab_id="tab-workforce"),
-
-                dbc.Tab([
-                    dbc.Row([
-                        dbc.Col([
-                            dcc.Loading(
-                                html.Iframe(
-                                    id="enrollment-projections",
-                                    src="/assets/enrollment_projections.html",
-                                    style={"width": "100%", "height": "400px", "border": "none"},
-                                ),
-                                type="circle"
-                            )
-                        ], width=12, lg=6),
-
-                        dbc.Col([
-                            dcc.Loading(
-                                html.Iframe(
-                                    id="historical-projected-graduates",
-                                    src="/assets/historical_projected_graduates.html",
-                                    style={"width": "100%", "height": "400px", "border": "none"},
-                                ),
-                                type="circle"
-                            )
-                        ], width=12, lg=6),
-                    ]),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Current enrollment projections generated from the NC Tower database show modest growth that is insufficient to meet workforce demand without targeted intervention. Certificate programs produce the most graduates and are the only ones actually growing, whereas shorter Diploma programs may need to be expanded to address immediate shortages."
-                        ], className="mt-3")
-                    ])
-                ], label="Enrollment & Graduates", tab_id="tab-enrollment"),
-
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="completion_timing",
-                            src="/assets/completion_timing.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Mobility outflows are particularly strong, with retirements making up the largest portion of separations. Mobility inflows are taken form the pool of workers from the 10 most similar occupations (as defined by O*NET) and their respective mobility rates, which contribute to an available pool of workers. Retirement distributions from 2024 distribution show a mid-heavy, noting the value of technical expertise in this occupation and low younger entrants. Age distribution for this occupation comes from the latest IPUMS data in North Carolina."
+                            ], className="mt-3")
+                        ])
+                    ], label="Workforce Composition", tab_id="tab-workforce"),
+
+                    dbc.Tab([
+                        dbc.Row([
+                            dbc.Col([
+                                dcc.Loading(
+                                    chart_graph("enrollment-projections", region, soc, height="400px"),
+                                    type="circle"
+                                )
+                            ], width=12, lg=6),
+
+                            dbc.Col([
+                                dcc.Loading(
+                                    chart_graph("historical-projected-graduates", region, soc, height="400px"),
+                                    type="circle"
+                                )
+                            ], width=12, lg=6),
+                        ]),
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Current enrollment projections generated from the NC Tower database show modest growth that is insufficient to meet workforce demand without targeted intervention. Certificate programs produce the most graduates and are the only ones actually growing, whereas shorter Diploma programs may need to be expanded to address immediate shortages."
+                            ], className="mt-3")
+                        ])
+                    ], label="Enrollment & Graduates", tab_id="tab-enrollment"),
+
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("completion_timing", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Certificate and Diploma programs have shorter completion times, allowing for quicker workforce entry, while Associate's Degrees take 2-3 years on average to complete."
-                        ], className="mt-3")
-                    ])
-                ], label="Completion Rates", tab_id="tab-completion"),
-
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="monthly-graduates",
-                            src="/assets/monthly_graduates_stacked.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Certificate and Diploma programs have shorter completion times, allowing for quicker workforce entry, while Associate's Degrees take 2-3 years on average to complete."
+                            ], className="mt-3")
+                        ])
+                    ], label="Completion Rates", tab_id="tab-completion"),
+
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("monthly-graduates", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Talent pipeline growth is spurred by Certificate completions, but slowing down. Monthly graduation patterns from annual data (due to data availability) mask some seasonality that affects the timing of workforce entry, with expected peaks in May-June and December."
-                        ], className="mt-3")
-                    ])
-                ], label="Graduate Patterns", tab_id="tab-patterns"),
-            ], id="supply-tabs", active_tab="tab-employment")
-        ], width=12)
-    ], className="mb-5"),
-
-    # ==================================== SECTION 4: JOB EVOLUTION ====================================
-    dbc.Row([
-        dbc.Col([
-            html.H3("Occupational Evolution Analysis", id="jobs", className="mb-3 section-header"),
-            html.P(
-                "Skill clustering and job title analysis showing how Industrial Machinery Mechanics roles are evolving",
-                className="text-muted"),
-        ], width=12)
-    ], className="mb-3"),
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Tabs([
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="job-clusters",
-                            src="/assets/job_clusters_tsne.html",
-                            style={"width": "100%", "height": "600px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Talent pipeline growth is spurred by Certificate completions, but slowing down. Monthly graduation patterns from annual data (due to data availability) mask some seasonality that affects the timing of workforce entry, with expected peaks in May-June and December."
+                            ], className="mt-3")
+                        ])
+                    ], label="Graduate Patterns", tab_id="tab-patterns"),
+                ], id="supply-tabs", active_tab="tab-employment"),
+                *tab_stores("supply-tabs"),
+            ], width=12)
+        ], className="mb-5"),
+
+        # ==================================== SECTION 4: JOB EVOLUTION ====================================
+        dbc.Row([
+            dbc.Col([
+                html.H3("Occupational Evolution Analysis", id="jobs", className="mb-3 section-header"),
+                html.P(
+                    f"Skill clustering and job title analysis showing how {occupation} roles are evolving",
+                    className="text-muted"),
+            ], width=12)
+        ], className="mb-3"),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Tabs([
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("job-clusters", region, soc, height="600px"),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Job titles within this SOC occupation cluster into three functional groups across the following boundaries based on similarity in skills and roles: 'Maintenance & Technical Specialists', 'Design & Engineering Specialists', and 'Quality & Process Specialists'."
-                        ], className="mt-3")
-                    ])
-                ], label="Job Clusters", tab_id="tab-clusters"),
-
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="occupation-distribution",
-                            src="/assets/occupation_distribution.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Job titles within this SOC occupation cluster into three functional groups across the following boundaries based on similarity in skills and roles: 'Maintenance & Technical Specialists', 'Design & Engineering Specialists', and 'Quality & Process Specialists'."
+                            ], className="mt-3")
+                        ])
+                    ], label="Job Clusters", tab_id="tab-clusters"),
+
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("occupation-distribution", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Traditional occupational boundaries (SOC codes) don't fully capture the functional similarity between jobs that require similar skill sets."
-                        ], className="mt-3")
-                    ])
-                ], label="Occupational Distribution", tab_id="tab-occupation"),
-
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="skill-heatmap",
-                            src="/assets/skill_heatmap.html",
-                            style={"width": "100%", "height": "600px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Traditional occupational boundaries (SOC codes) don't fully capture the functional similarity between jobs that require similar skill sets."
+                            ], className="mt-3")
+                        ])
+                    ], label="Occupational Distribution", tab_id="tab-occupation"),
+
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("skill-heatmap", region, soc, height="600px"),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            "Each functional cluster has distinct skill patterns: maintenance specialists focus on equipment, repair and troubleshooting; engineering specialists on design and systems analysis; quality specialists on process control."
-                        ], className="mt-3")
-                    ])
-                ], label="Skill Patterns", tab_id="tab-skills"),
-            ], id="jobs-tabs", active_tab="tab-clusters")
-        ], width=12)
-    ], className="mb-5"),
-
-    # ==================================== SECTION 5: SHORTAGE PROJECTIONS ====================================
-    dbc.Row([
-        dbc.Col([
-            html.H3("Shortage Projections & Parameters", id="shortage", className="mb-3 section-header"),
-            html.P("Projected workforce shortages and key model parameters influencing the labor market",
-                   className="text-muted"),
-        ], width=12)
-    ], className="mb-3"),
-
-    dbc.Row([
-        dbc.Col([
-            dbc.Tabs([
-                dbc.Tab([
-                    dcc.Loading(
-                        html.Iframe(
-                            id="shortage-comparison",
-                            src="/assets/shortage_comparison.html",
-                            style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                "Each functional cluster has distinct skill patterns: maintenance specialists focus on equipment, repair and troubleshooting; engineering specialists on design and systems analysis; quality specialists on process control."
+                            ], className="mt-3")
+                        ])
+                    ], label="Skill Patterns", tab_id="tab-skills"),
+                ], id="jobs-tabs", active_tab="tab-clusters"),
+                *tab_stores("jobs-tabs"),
+            ], width=12)
+        ], className="mb-5"),
+
+        # ==================================== SECTION 5: SHORTAGE PROJECTIONS ====================================
+        dbc.Row([
+            dbc.Col([
+                html.H3("Shortage Projections & Parameters", id="shortage", className="mb-3 section-header"),
+                html.P("Projected workforce shortages and key model parameters influencing the labor market",
+                       className="text-muted"),
+            ], width=12)
+        ], className="mb-3"),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Tabs([
+                    dbc.Tab([
+                        dcc.Loading(
+                            chart_graph("shortage-comparison", region, soc),
+                            type="circle"
                         ),
-                        type="circle"
-                    ),
-                    html.Div([
-                        html.P([
-                            html.Strong("Key Finding: "),
-                            f"Monthly shortages persist even with optimal training and inflow scenarios (albeit much less), with the baseline showing approximately {key_metrics['avg_monthly_shortage']} unfilled positions per month on average."
-                        ], className="mt-3")
-                    ])
-                ], label="Shortage Projections", tab_id="tab-shortage"),
-
-                dbc.Tab([
-                    # UPDATED: Added 2-column layout for the Model Parameters tab
-                    dbc.Row([
-                        # First column: Time-variant parameters
-                        dbc.Col([
-                            dcc.Loading(
-                                html.Iframe(
-                                    id="time-variant-parameters",
-                                    src="/assets/time_variant_parameters.html",
-                                    style={"width": "100%", "height": "500px", "border": "none"},
+                        html.Div([
+                            html.P([
+                                html.Strong("Key Finding: "),
+                                f"Monthly shortages persist even with optimal training and inflow scenarios (albeit much less), with the baseline showing approximately {format_metric(metrics, 'avg_monthly_shortage')} unfilled positions per month on average."
+                            ], className="mt-3")
+                        ]),
+                        dbc.Button("Show Uncertainty Range", id="run-shortage-bands", n_clicks=0,
+                                   color="primary", outline=True, size="sm", className="mb-3"),
+                        dcc.Loading(
+                            dcc.Graph(id="shortage-bands", style={"width": "100%", "height": "450px", "display": "none"}),
+                            type="circle"
+                        ),
+                    ], label="Shortage Projections", tab_id="tab-shortage"),
+
+                    dbc.Tab([
+                        # UPDATED: Added 2-column layout for the Model Parameters tab
+                        dbc.Row([
+                            # First column: Time-variant parameters
+                            dbc.Col([
+                                dcc.Loading(
+                                    chart_graph("time-variant-parameters", region, soc),
+                                    type="circle"
                                 ),
-                                type="circle"
-                            ),
-                            html.Div([
-                                html.P([
-                                    html.Strong("Key Finding: "),
-                                    "Time-variant parameters reveal how retirement rates increase over time due to workforce aging (IPUMS), while transfer rates fluctuate with economic conditions. These include unemployment variations around the natural rate for Charlotte (BLS) or wage differentials with similar occupations (NC Commerce)."
-                                ], className="mt-2 mb-4")
-                            ])
-                        ], width=12, lg=6),
-
-                        # Second column: Matching rates
-                        dbc.Col([
-                            dcc.Loading(
-                                html.Iframe(
-                                    id="matching-efficiency",
-                                    src="/assets/matching_efficiency.html",
-                                    style={"width": "100%", "height": "500px", "border": "none"},
+                                html.Div([
+                                    html.P([
+                                        html.Strong("Key Finding: "),
+                                        f"Time-variant parameters reveal how retirement rates increase over time due to workforce aging (IPUMS), while transfer rates fluctuate with economic conditions. These include unemployment variations around the natural rate for {region_name} (BLS) or wage differentials with similar occupations (NC Commerce)."
+                                    ], className="mt-2 mb-4")
+                                ])
+                            ], width=12, lg=6),
+
+                            # Second column: Matching rates
+                            dbc.Col([
+                                dcc.Loading(
+                                    chart_graph("matching-efficiency", region, soc),
+                                    type="circle"
                                 ),
-                                type="circle"
-                            ),
-                            html.Div([
-                                html.P([
-                                    html.Strong("Key Finding: "),
-                                    "Matching efficiency hovers around a standard 0.7 (70%), fluctuating as the economy changes (high labor market slack suggests high unemployment so employers can be more selective and filter out many less-suited candidates, while in a tight labor market there are less available workers so employers invest more resources in recruiting and must be less selective), and calibration based on the divergence between the model's employment and inflow figures from NC Commerce official forecasts."
-                                ], className="mt-2")
-                            ])
-                        ], width=12, lg=6),
-                    ]),
-                ], label="Model Parameters", tab_id="tab-parameters"),
-            ], id="shortage-tabs", active_tab="tab-shortage")
-        ], width=12)
-    ], className="mb-5"),
-
-    # ==================================== FOOTER ====================================
-    dbc.Row([
-        dbc.Col([
-            html.Hr(),
-            html.P("© 2025 Radius Intelligence",
-                   className="text-center text-muted")
-        ], width=12)
-    ]),
-
-], fluid=True)
+                                html.Div([
+                                    html.P([
+                                        html.Strong("Key Finding: "),
+                                        "Matching efficiency hovers around a standard 0.7 (70%), fluctuating as the economy changes (high labor market slack suggests high unemployment so employers can be more selective and filter out many less-suited candidates, while in a tight labor market there are less available workers so employers invest more resources in recruiting and must be less selective), and calibration based on the divergence between the model's employment and inflow figures from NC Commerce official forecasts."
+                                    ], className="mt-2")
+                                ])
+                            ], width=12, lg=6),
+                        ]),
+                    ], label="Model Parameters", tab_id="tab-parameters"),
+
+                    dbc.Tab([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label("Training capacity (x current)", className="mt-3"),
+                                dcc.Slider(id="whatif-training", min=1, max=4, step=0.1, value=1,
+                                           marks={i: f"{i}x" for i in range(1, 5)}),
+                            ], width=12, md=4),
+                            dbc.Col([
+                                html.Label("Mobility inflows (x current)", className="mt-3"),
+                                dcc.Slider(id="whatif-mobility", min=1, max=4, step=0.1, value=1,
+                                           marks={i: f"{i}x" for i in range(1, 5)}),
+                            ], width=12, md=4),
+                            dbc.Col([
+                                html.Label("Matching efficiency", className="mt-3"),
+                                dcc.Slider(id="whatif-matching", min=0.5, max=0.9, step=0.01, value=0.7,
+                                           marks={v / 10: f"{v / 10:.1f}" for v in range(5, 10)}),
+                            ], width=12, md=4),
+                        ]),
+                        dbc.Row([
+                            dbc.Col([
+                                dcc.Loading(dcc.Graph(id="whatif-shortage", style={"width": "100%", "height": "450px"}),
+                                            type="circle"),
+                            ], width=12, lg=6),
+                            dbc.Col([
+                                dcc.Loading(dcc.Graph(id="whatif-employment", style={"width": "100%", "height": "450px"}),
+                                            type="circle"),
+                            ], width=12, lg=6),
+                        ]),
+                        html.Div([
+                            html.P(id="whatif-summary", className="mt-3")
+                        ])
+                    ], label="What-If Scenarios", tab_id="tab-whatif"),
+                ], id="shortage-tabs", active_tab="tab-shortage"),
+                *tab_stores("shortage-tabs"),
+            ], width=12)
+        ], className="mb-5"),
+
+        # ==================================== FOOTER ====================================
+        dbc.Row([
+            dbc.Col([
+                html.Hr(),
+                html.P("© 2025 Radius Intelligence",
+                       className="text-center text-muted")
+            ], width=12)
+        ]),
+
+    ], fluid=True)
+
+def not_found_page(pathname):
+    return dbc.Container([
+        html.H3("Dashboard not found", className="mt-5 text-primary"),
+        html.P(f"No forecast is available for {pathname}. Dashboards are served at /<region>/<soc-code>."),
+        html.A("Go to the default dashboard", href="/", className="btn btn-outline-primary btn-sm"),
+    ])
+
+
+app.layout = html.Div([
+    dcc.Location(id="url"),
+    dcc.Store(id="selection"),
+    dcc.Store(id="viewport-width"),
+    dcc.Store(id="figure-cache", storage_type="session"),
+    html.Div(id="page-content"),
+])
+
+# Hash of this file: snapshots written by a different version of the app are ignored
+with open(__file__, "rb") as f:
+    app_source_sha256 = hashlib.sha256(f.read()).hexdigest()
+
+
+def dashboard_layout(region, soc):
+    """The combination's prebuilt snapshot when it matches this app, settings, charts and model output, else a
+    freshly built dashboard; either is rebuilt once new charts are compiled or new model output is dropped in."""
+    return _dashboard_layout(region, soc, data_revision(), data_store.source_hash(region, soc))
+
+
+@lru_cache(maxsize=dashboard_cache_size)
+def _dashboard_layout(region, soc, charts_revision, model_output_sha256):
+    snapshot = load_layout_snapshot(region, soc)
+    if snapshot is not None:
+        entry, layout = snapshot
+        # Snapshots embed the key metrics and some figures, so they must have been taken from the same data
+        if (entry.get("app_sha256") == app_source_sha256 and entry.get("lazy_charts") == lazy_charts
+                and entry.get("charts_revision") == charts_revision
+                and entry.get("model_output_sha256") == model_output_sha256):
+            return layout
+    return build_dashboard(region, soc)
+
+
+def warm_caches(region, soc):
+    """Fill this process's caches for one dashboard: its layout, every chart's figure and its key metrics."""
+    dashboard_layout(region, soc)
+    for frame_id in chart_sources:
+        load_chart(chart_sources[frame_id], region, soc)
+    combination_metrics(region, soc)
+
+
+# Route /<region>/<soc> to its dashboard
+@callback(
+    Output("page-content", "children"),
+    Output("selection", "data"),
+    Input("url", "pathname"),
+)
+def route(pathname):
+    selection = data_store.parse_path(pathname)
+    if selection is None:
+        return not_found_page(pathname), None
+    # The revision invalidates figures cached in the browser once the charts are rebuilt
+    return dashboard_layout(selection["region"], selection["soc"]), {"region": selection["region"],
+                                                                     "soc": selection["soc"],
+                                                                     "revision": data_revision()}
+
+
+# Open and close the navbar on small screens without a server round trip
+clientside_callback(
+    "function(n_clicks, is_open) { return !is_open; }",
+    Output("navbar-collapse", "is_open"),
+    Input("navbar-toggler", "n_clicks"),
+    State("navbar-collapse", "is_open"),
+    prevent_initial_call=True,
+)
+
+
+# Record the browser width so dense charts are downsampled to what the screen can show
+clientside_callback(
+    "function(pathname) { return window.innerWidth; }",
+    Output("viewport-width", "data"),
+    Input("url", "pathname"),
+)
+
 
 # Add CSS for better scrolling and navigation
 app.index_string = '''
@@ -581,6 +779,77 @@ app.index_string = '''
                 z-index: 1000;
             }
         </style>
+        <script>
+            // Session figure cache behind the tab callbacks (register_lazy_tabs): figures by
+            // region/soc/chart/width, evicted least recently used first
+            window.dash_clientside = Object.assign(window.dash_clientside || {}, {figure_cache: {
+                _open: function(cache, selection) {
+                    if (!cache || cache.revision !== selection.revision) {
+                        cache = {revision: selection.revision, order: [], chars: {}, figures: {}};
+                    }
+                    return cache;
+                },
+                _key: function(selection, frameId, width) {
+                    return [selection.region, selection.soc, frameId, width || ""].join("/");
+                },
+                _use: function(cache, key) {
+                    cache.order = cache.order.filter(function(k) { return k !== key; }).concat([key]);
+                },
+
+                // Tab opened: nothing for a tab already on the page, its figures when all are cached, else a
+                // request for the server
+                show_tab: function(charts, activeTab, loaded, cache, selection, width) {
+                    var fc = window.dash_clientside.figure_cache;
+                    var noUpdate = window.dash_clientside.no_update;
+                    var frameIds = [].concat.apply([], Object.values(charts));
+                    var figures = frameIds.map(function() { return noUpdate; });
+                    loaded = loaded || [];
+                    if (!selection || !(activeTab in charts) || loaded.indexOf(activeTab) >= 0) {
+                        return figures.concat([noUpdate, noUpdate, noUpdate]);
+                    }
+                    cache = fc._open(cache, selection);
+                    var keys = charts[activeTab].map(function(frameId) { return fc._key(selection, frameId, width); });
+                    if (!keys.every(function(k) { return k in cache.figures; })) {
+                        return figures.concat([noUpdate, {tab: activeTab, requested: Date.now()}, noUpdate]);
+                    }
+                    charts[activeTab].forEach(function(frameId, i) {
+                        figures[frameIds.indexOf(frameId)] = cache.figures[keys[i]];
+                        fc._use(cache, keys[i]);
+                    });
+                    return figures.concat([loaded.concat([activeTab]), noUpdate, cache]);
+                },
+
+                // Server reply: show the tab's figures and keep them for the session
+                store_tab: function(charts, maxChars, maxEntries, reply, loaded, cache, selection, width) {
+                    var fc = window.dash_clientside.figure_cache;
+                    var noUpdate = window.dash_clientside.no_update;
+                    var frameIds = [].concat.apply([], Object.values(charts));
+                    var figures = frameIds.map(function() { return noUpdate; });
+                    if (!reply || !selection) {
+                        return figures.concat([noUpdate, noUpdate]);
+                    }
+                    cache = fc._open(cache, selection);
+                    Object.keys(reply.figures).forEach(function(frameId) {
+                        var key = fc._key(selection, frameId, width);
+                        var chars = JSON.stringify(reply.figures[frameId]).length;
+                        figures[frameIds.indexOf(frameId)] = reply.figures[frameId];
+                        if (chars <= maxChars) {
+                            cache.figures[key] = reply.figures[frameId];
+                            cache.chars[key] = chars;
+                            fc._use(cache, key);
+                        }
+                    });
+                    var total = Object.values(cache.chars).reduce(function(a, b) { return a + b; }, 0);
+                    while (cache.order.length > maxEntries || total > maxChars) {
+                        var oldest = cache.order.shift();
+                        total -= cache.chars[oldest];
+                        delete cache.figures[oldest];
+                        delete cache.chars[oldest];
+                    }
+                    return figures.concat([(loaded || []).concat([reply.tab]), cache]);
+                }
+            }});
+        </script>
     </head>
     <body>
         {%app_entry%}
@@ -593,6 +862,150 @@ app.index_string = '''
 </html>
 '''
 
+
+# Load a tab's charts the first time it becomes active. Switching tabs is handled in the browser: a tab already
+# loaded on this page needs nothing and one cached earlier in the session is filled from the figure cache. Only the
+# rest ask the server (request store -> load_tab -> figures store), and a second browser callback shows the reply and
+# caches it; it does not write the request store, so the chain has no cycle
+def register_lazy_tabs(tabs_id, charts):
+    frame_ids = [frame_id for frames in charts.values() for frame_id in frames]
+
+    clientside_callback(
+        f"""function(activeTab, loaded, cache, selection, width) {{
+            return window.dash_clientside.figure_cache.show_tab({json.dumps(charts)}, activeTab, loaded, cache,
+                selection, width);
+        }}""",
+        [Output(frame_id, "figure") for frame_id in frame_ids],
+        Output(f"{tabs_id}-loaded", "data"),
+        Output(f"{tabs_id}-request", "data"),
+        Output("figure-cache", "data", allow_duplicate=True),
+        Input(tabs_id, "active_tab"),
+        State(f"{tabs_id}-loaded", "data"),
+        State("figure-cache", "data"),
+        State("selection", "data"),
+        State("viewport-width", "data"),
+        prevent_initial_call="initial_duplicate",
+    )
+
+    @callback(
+        Output(f"{tabs_id}-figures", "data"),
+        Input(f"{tabs_id}-request", "data"),
+        State("selection", "data"),
+        State("viewport-width", "data"),
+        prevent_initial_call=True,
+    )
+    def load_tab(request, selection, viewport_width):
+        if not request or request["tab"] not in charts or not selection:
+            raise PreventUpdate
+        return {"tab": request["tab"], "figures": {
+            frame_id: chart_figure(frame_id, selection["region"], selection["soc"], viewport_width)
+            for frame_id in charts[request["tab"]]}}
+
+    clientside_callback(
+        f"""function(reply, loaded, cache, selection, width) {{
+            return window.dash_clientside.figure_cache.store_tab({json.dumps(charts)}, {figure_cache_chars},
+                {figure_cache_entries}, reply, loaded, cache, selection, width);
+        }}""",
+        [Output(frame_id, "figure", allow_duplicate=True) for frame_id in frame_ids],
+        Output(f"{tabs_id}-loaded", "data", allow_duplicate=True),
+        Output("figure-cache", "data", allow_duplicate=True),
+        Input(f"{tabs_id}-figures", "data"),
+        State(f"{tabs_id}-loaded", "data"),
+        State("figure-cache", "data"),
+        State("selection", "data"),
+        State("viewport-width", "data"),
+        prevent_initial_call=True,
+    )
+
+
+if lazy_charts:
+    for tabs_id, tabs in tab_charts.items():
+        register_lazy_tabs(tabs_id, tabs)
+
+
+# Re-sample a dense chart for the range the user zoomed or panned to (back to the overview when the zoom is reset)
+def register_zoom_detail(frame_id):
+    @callback(
+        Output(frame_id, "figure", allow_duplicate=True),
+        Input(frame_id, "relayoutData"),
+        State("selection", "data"),
+        State("viewport-width", "data"),
+        prevent_initial_call=True,
+    )
+    def zoom_detail(relayout_data, selection, viewport_width):
+        from downsample import relayout_ranges
+
+        ranges = relayout_ranges(relayout_data)
+        if ranges is None or not selection:
+            raise PreventUpdate
+        return chart_figure(frame_id, selection["region"], selection["soc"], viewport_width, *ranges)
+
+
+for frame_id in downsampled_charts:
+    register_zoom_detail(frame_id)
+
+
+# Re-run the simulation for the what-if sliders; results are memoized on the slider values
+@callback(
+    Output("whatif-shortage", "figure"),
+    Output("whatif-employment", "figure"),
+    Output("whatif-summary", "children"),
+    Input("whatif-training", "value"),
+    Input("whatif-mobility", "value"),
+    Input("whatif-matching", "value"),
+    State("selection", "data"),
+)
+def update_whatif(training, mobility, matching, selection):
+    if not selection:
+        raise PreventUpdate
+    metrics = combination_metrics(selection["region"], selection["soc"])
+    from charts import whatif_scenario
+
+    shortage_fig, employment_fig, summary = whatif_scenario(training, mobility, matching,
+                                                            **simulation_overrides(metrics))
+    return shortage_fig, employment_fig, [
+        html.Strong("Scenario: "),
+        f"average monthly shortage of {summary['avg_monthly_shortage']:,.0f} positions "
+        f"(baseline {summary['baseline_avg_monthly_shortage']:,.0f}), "
+        f"{summary['total_cumulative_shortage']:,.0f} unfilled positions over 2025-2030."
+    ]
+
+# Monte Carlo P10/P50/P90 shortage bands, computed on request (seeded, so every worker returns the same bands); the
+# chart is revealed in the browser right away, with the loading spinner until the bands arrive
+clientside_callback(
+    "function(n_clicks, style) { return Object.assign({}, style, {display: 'block'}); }",
+    Output("shortage-bands", "style"),
+    Input("run-shortage-bands", "n_clicks"),
+    State("shortage-bands", "style"),
+    prevent_initial_call=True,
+)
+
+
+@callback(
+    Output("shortage-bands", "figure"),
+    Input("run-shortage-bands", "n_clicks"),
+    State("selection", "data"),
+    prevent_initial_call=True,
+)
+def show_shortage_bands(n_clicks, selection):
+    if not n_clicks or not selection:
+        raise PreventUpdate
+    metrics = combination_metrics(selection["region"], selection["soc"])
+    from charts import shortage_bands_figure
+
+    return shortage_bands_figure(**simulation_overrides(metrics))
+
+
+# Server-side caches reported on /metrics (by name where the module is imported on first use)
+watch_cache("dashboards", _dashboard_layout)
+watch_cache("figures", "figure_store._load_compiled")
+watch_cache("figure_exports", "figure_store._load_export")
+watch_cache("whatif_scenarios", "charts._whatif_scenario")
+watch_cache("shortage_bands", "charts.shortage_bands_figure")
+watch_cache("model_output_slices", data_store._model_output_slice)
+watch_cache("chart_series", chart_series)
+
+
 # Run the application
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
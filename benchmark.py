@@ -0,0 +1,324 @@
+# Load and page-weight benchmarks for the dashboard server
+#
+#   python benchmark.py [--requests 200] [--concurrency 8] [--url http://host:port] [--compare benchmarks/<old>.json]
+#
+# Without --url, app.server is started in-process on a free local port; with it, any running deployment (e.g.
+# gunicorn from the Procfile) is measured instead. Measures latency of the Dash bootstrap endpoints, throughput of the
+# static bundles under concurrency, bytes transferred for one full page visit, and callback latency. Results are
+# written to benchmarks/<commit>.json so runs on different commits can be compared with --compare.
+#
+#   python benchmark.py --startup
+#
+# only reports how long a fresh worker takes to become ready, with the import time of app.py broken down by module.
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import data_store
+
+results_dir = "benchmarks"
+
+# Sent with every request, like a current browser
+request_headers = {"Accept-Encoding": "br, gzip", "User-Agent": "dashboard-benchmark"}
+
+selection = {"region": data_store.default_selection["region"], "soc": data_store.default_selection["soc"]}
+
+# Callbacks to time, as (first input, input values, state values); matched against /_dash-dependencies by their
+# inputs so the benchmark follows renamed outputs
+callback_scenarios = {
+    "route": ([("url", "pathname", "/")], []),
+    "lazy_tab": ([("jobs-tabs-request", "data", {"tab": "tab-clusters"})],
+                 [("selection", "data", selection), ("viewport-width", "data", 1200)]),
+    "whatif": ([("whatif-training", "value", 2), ("whatif-mobility", "value", 1.5), ("whatif-matching", "value", 0.75)],
+               [("selection", "data", selection)]),
+    "zoom": ([("scenario-forecasts", "relayoutData", {"xaxis.range[0]": "2026-01-01", "xaxis.range[1]": "2027-01-01"})],
+             [("selection", "data", selection), ("viewport-width", "data", 1200)]),
+    "shortage_bands": ([("run-shortage-bands", "n_clicks", 1)],
+                       [("selection", "data", selection)]),
+}
+
+# Callbacks that fire when the default page loads (in addition to the route); each Tabs asks the server for its
+# active tab once, with an empty browser figure cache
+page_load_callbacks = ["route", "whatif"]
+page_load_tabs = {"demand-tabs": "tab-scenario", "supply-tabs": "tab-employment", "jobs-tabs": "tab-clusters",
+                  "shortage-tabs": "tab-shortage"}
+
+
+# Run in a fresh interpreter: import the app, then serve the first page load (index, layout, route callback)
+startup_script = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.server.test_client()
+client.get("/")
+client.get("/_dash-layout")
+route = next(dep for dep in client.get("/_dash-dependencies").get_json() if dep["inputs"][0]["id"] == "url"
+             and not dep.get("clientside_function"))
+client.post("/_dash-update-component", json={
+    "output": route["output"], "inputs": [{"id": "url", "property": "pathname", "value": "/"}], "state": [],
+    "outputs": [{"id": "page-content", "property": "children"}, {"id": "selection", "property": "data"}]})
+print(json.dumps({"import_seconds": imported - start, "first_page_seconds": time.perf_counter() - imported}))
+"""
+
+
+def _import_times(stderr):
+    """(module, depth, self ms, cumulative ms) rows of python -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000
+
+
+def startup_report(top=15):
+    """Seconds until a fresh worker has answered its first page load, and app.py's import time by module."""
+    start = time.perf_counter()
+    timings = json.loads(subprocess.run([sys.executable, "-c", startup_script], capture_output=True, text=True,
+                                        check=True).stdout.splitlines()[-1])
+    ready = time.perf_counter() - start
+    traced = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], capture_output=True,
+                            text=True, check=True)
+    rows = list(_import_times(traced.stderr))
+    # importtime prints a module after its imports: app's own imports are the rows just above it, back to the
+    # previous module at app's depth or shallower
+    position = next(i for i, row in enumerate(rows) if row[0] == "app")
+    first = position
+    while first > 0 and rows[first - 1][1] > rows[position][1]:
+        first -= 1
+    direct = [row for row in rows[first:position] if row[1] == rows[position][1] + 1]
+    return {
+        "ready_seconds": round(ready, 3),
+        "import_seconds": round(timings["import_seconds"], 3),
+        "first_page_seconds": round(timings["first_page_seconds"], 3),
+        # Attributed to whichever module imported a package first; -X importtime itself adds some overhead
+        "app_imports_ms": {name: round(cumulative, 1) for name, _, _, cumulative in
+                           sorted(direct, key=lambda row: -row[3])[:top]},
+        "heaviest_modules_ms": {name: round(own, 1) for name, _, own, _ in
+                                sorted(rows, key=lambda row: -row[2])[:top]},
+    }
+
+
+def start_local_server():
+    """Serve app.server on a free port in a background thread; returns its base URL."""
+    from werkzeug.serving import make_server
+
+    from app import server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request log lines
+    local = make_server("127.0.0.1", 0, server, threaded=True)
+    threading.Thread(target=local.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{local.server_port}"
+
+
+class Client(threading.local):
+    """One keep-alive connection per thread."""
+
+    def __init__(self, base_url):
+        self.netloc = urlsplit(base_url).netloc
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """(status, bytes on the wire, seconds) of one request."""
+        headers = dict(request_headers)
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.netloc, timeout=120)
+            start = time.perf_counter()
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = None  # the server closed the keep-alive connection; retry on a new one
+                if attempt:
+                    raise
+                continue
+            return response.status, data, time.perf_counter() - start
+
+
+def latency_stats(timings, sizes):
+    ms = np.array(timings) * 1000
+    return {
+        "requests": len(ms),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+        "bytes": int(np.mean(sizes)),
+    }
+
+
+def run_load(client, requests, concurrency):
+    """Send (method, path, body) requests from concurrency threads; returns latency stats plus throughput."""
+    def send(request):
+        status, data, seconds = client.request(*request)
+        if status >= 400:
+            raise RuntimeError(f"{request[0]} {request[1]}: HTTP {status}")
+        return seconds, len(data)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings, sizes = zip(*executor.map(send, requests))
+    elapsed = time.perf_counter() - start
+    return {**latency_stats(timings, sizes),
+            "requests_per_second": round(len(requests) / elapsed, 1),
+            "megabytes_per_second": round(sum(sizes) / elapsed / 1e6, 2)}
+
+
+def page_resources(html, external=False):
+    """Script and stylesheet URLs referenced by the index page: those served by the app, or the external ones
+    (CDN stylesheets, not measured)."""
+    urls = re.findall(r'<script src="([^"]+)"', html) + re.findall(r'<link rel="stylesheet" href="([^"]+)"', html)
+    return [url for url in urls if url.startswith("/") != external]
+
+
+def _output_spec(output):
+    """The outputs field Dash expects for a callback's output key."""
+    if output.startswith(".."):
+        return [_output_spec(part) for part in output[2:-2].split("...")]
+    component, prop = output.split("@")[0].rsplit(".", 1)
+    return {"id": component, "property": prop}
+
+
+def callback_body(dependencies, inputs, state):
+    """/_dash-update-component request for the server callback whose first input is inputs[0]."""
+    first = {"id": inputs[0][0], "property": inputs[0][1]}
+    spec = next(dep for dep in dependencies
+                if not dep.get("clientside_function") and dep["inputs"][0] == first)
+    return {
+        "output": spec["output"],
+        "outputs": _output_spec(spec["output"]),
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+        "changedPropIds": [f"{inputs[0][0]}.{inputs[0][1]}"],
+    }
+
+
+def page_visit(client, dependencies):
+    """Requests and bytes transferred for one cold visit to the default dashboard."""
+    _, index, _ = client.request("GET", "/")
+    requests = [("GET", "/_dash-layout", None), ("GET", "/_dash-dependencies", None)]
+    requests += [("GET", url, None) for url in page_resources(index.decode())]
+    for name in page_load_callbacks:
+        requests.append(("POST", "/_dash-update-component", callback_body(dependencies, *callback_scenarios[name])))
+    for tabs_id, tab in page_load_tabs.items():
+        requests.append(("POST", "/_dash-update-component", callback_body(
+            dependencies, [(f"{tabs_id}-request", "data", {"tab": tab})],
+            [("selection", "data", selection), ("viewport-width", "data", 1200)])))
+
+    by_kind = {"html": len(index), "bootstrap": 0, "bundles": 0, "callbacks": 0}
+    for method, path, body in requests:
+        _, data, _ = client.request(method, path, body)
+        kind = "callbacks" if method == "POST" else "bootstrap" if path.startswith(("/_dash-layout", "/_dash-dep")) \
+            else "bundles"
+        by_kind[kind] += len(data)
+    return {"requests": len(requests) + 1, "bytes": sum(by_kind.values()), "bytes_by_kind": by_kind,
+            "external_resources": page_resources(index.decode(), external=True)}
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(base_url, n_requests=200, concurrency=8):
+    client = Client(base_url)
+    _, index, _ = client.request("GET", "/")
+    _, dependencies, _ = client.request("GET", "/_dash-dependencies")
+    dependencies = json.loads(dependencies)
+
+    endpoints = {path: run_load(client, [("GET", path, None)] * n_requests, concurrency)
+                 for path in ("/", "/_dash-layout", "/_dash-dependencies")}
+
+    resources = page_resources(index.decode())
+    assets = run_load(client, [("GET", resources[i % len(resources)], None) for i in range(n_requests)], concurrency)
+
+    callbacks = {}
+    for name, (inputs, state) in callback_scenarios.items():
+        body = callback_body(dependencies, inputs, state)
+        # Cold call first (fills the server caches), then the repeated calls a busy server mostly sees
+        _, _, cold = client.request("POST", "/_dash-update-component", body)
+        callbacks[name] = {**run_load(client, [("POST", "/_dash-update-component", body)] * max(n_requests // 10, 5),
+                                      concurrency),
+                           "cold_ms": round(cold * 1000, 2)}
+
+    return {
+        "commit": current_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {"url": base_url, "requests": n_requests, "concurrency": concurrency},
+        "endpoints": endpoints,
+        "assets": assets,
+        "page_visit": page_visit(client, dependencies),
+        "callbacks": callbacks,
+        "startup": startup_report(),
+    }
+
+
+def compare(old, new):
+    """Print the change of the headline numbers between two result files."""
+    rows = [(f"{path} p95_ms", ("endpoints", path, "p95_ms")) for path in new["endpoints"]]
+    rows += [("assets requests_per_second", ("assets", "requests_per_second")),
+             ("page_visit bytes", ("page_visit", "bytes"))]
+    rows += [(f"callback {name} p95_ms", ("callbacks", name, "p95_ms")) for name in new["callbacks"]]
+    rows += [("startup ready_seconds", ("startup", "ready_seconds"))]
+    print(f"{'':40} {old['commit']:>10} {new['commit']:>10}")
+    for label, keys in rows:
+        before, after = old, new
+        for key in keys:
+            before = before.get(key, {}) if isinstance(before, dict) else {}
+            after = after.get(key, {}) if isinstance(after, dict) else {}
+        if isinstance(before, (int, float)) and before:
+            print(f"{label:40} {before:>10,} {after:>10,}  {(after - before) / before:+.1%}")
+        else:
+            print(f"{label:40} {'-':>10} {after:>10,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard server")
+    parser.add_argument("--url", help="benchmark a running server instead of starting app.server locally")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--out", help=f"result file (default: {results_dir}/<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--startup", action="store_true", help="only report worker start-up time")
+    args = parser.parse_args()
+
+    if args.startup:
+        print(json.dumps(startup_report(), indent=2))
+        raise SystemExit
+
+    results = run(args.url or start_local_server(), args.requests, args.concurrency)
+    out = args.out or os.path.join(results_dir, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({key: results[key] for key in ("endpoints", "assets", "page_visit")}, indent=2))
+    print(f"Results written to {out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
@@ -0,0 +1,214 @@
+# Asset compiler: turns the chart exports (standalone HTML or figure JSON) into compact, precompressed payloads
+#
+#   python build_assets.py [--assets-dir assets] [--figures-dir figures] [--out-dir compiled]
+#
+# Each figure's numeric arrays are stored as base64 typed buffers ({"dtype", "bdata", "shape"}) instead of
+# JSON float lists, then written as <name>.<hash>.json with .gz and .br variants and listed in manifest.json.
+# The remaining static files in the assets folder get .gz/.br siblings for static_assets.py to serve.
+# Finally the default dashboard is serialized (layouts/<region>/<soc> in the manifest) so workers load its component
+# tree instead of building it.
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from figure_store import assets_dir, compiled_dir, data_revision, figure_from_html, figures_dir
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, .br variants are skipped without it
+    brotli = None
+
+# Static files worth precompressing in place for static_assets.send_asset
+compressible_extensions = (".html", ".js", ".css", ".json", ".svg", ".txt", ".csv")
+
+# Shorter numeric lists stay as plain JSON, the buffer header would outweigh the savings
+min_typed_length = 8
+
+
+def _typed_array(values):
+    if len(values) < min_typed_length:
+        return None
+    if not isinstance(values[0], list):
+        values = [np.nan if v is None else v for v in values]
+    try:
+        arr = np.asarray(values)
+    except ValueError:  # ragged nested lists
+        return None
+    if arr.dtype.kind == "i" and arr.size and np.abs(arr).max() < 2 ** 31:
+        arr = arr.astype("<i4")
+    elif arr.dtype.kind in "if":
+        arr = arr.astype("<f8")
+    else:
+        return None
+    typed = {"dtype": arr.dtype.str[1:], "bdata": base64.b64encode(arr.tobytes()).decode("ascii")}
+    if arr.ndim > 1:
+        typed["shape"] = list(arr.shape)
+    return typed
+
+
+def pack_arrays(obj):
+    """Replace numeric lists in a trace with typed buffers."""
+    if isinstance(obj, dict):
+        return {key: pack_arrays(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        if all(v is None or isinstance(v, (int, float, list)) and not isinstance(v, bool) for v in obj):
+            typed = _typed_array(obj)
+            if typed is not None:
+                return typed
+        return [pack_arrays(value) for value in obj]
+    return obj
+
+
+def write_compressed(path, payload):
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(payload, quality=11))
+
+
+def write_variants(path, payload):
+    with open(path, "wb") as f:
+        f.write(payload)
+    write_compressed(path, payload)
+
+
+def precompress_assets(source_dir):
+    """Write .gz/.br siblings next to static assets that are new or changed since the last build."""
+    for current, _, files in os.walk(source_dir):
+        for file_name in files:
+            if not file_name.endswith(compressible_extensions):
+                continue
+            path = os.path.join(current, file_name)
+            gz_path = path + ".gz"
+            if os.path.exists(gz_path) and os.path.getmtime(gz_path) >= os.path.getmtime(path):
+                continue
+            with open(path, "rb") as f:
+                write_compressed(path, f.read())
+
+
+def compile_figure(source_path, out_dir, name=None):
+    """Compile one chart, given as a standalone HTML export or as figure JSON."""
+    name = name or os.path.splitext(os.path.basename(source_path))[0]
+    with open(source_path, encoding="utf-8") as f:
+        figure = json.load(f) if source_path.endswith(".json") else figure_from_html(f.read())
+    figure = {"data": [pack_arrays(trace) for trace in figure.get("data", [])], "layout": figure.get("layout", {})}
+    payload = json.dumps(figure, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(payload).hexdigest()
+    # Named after the chart and its content only, so identical charts shared by several combinations are stored once
+    file_name = f"{os.path.basename(name)}.{digest[:12]}.json"
+    if not os.path.exists(os.path.join(out_dir, file_name)):
+        write_variants(os.path.join(out_dir, file_name), payload)
+    return name, {
+        "file": file_name,
+        "sha256": digest,
+        "bytes": len(payload),
+        "source": os.path.relpath(source_path),
+        "source_bytes": os.path.getsize(source_path),
+    }
+
+
+def _chart_sources(source_dir, extension):
+    for current, _, files in sorted(os.walk(source_dir)):
+        for file_name in sorted(files):
+            if file_name.endswith(extension):
+                path = os.path.join(current, file_name)
+                # Combination-specific charts (<dir>/<region>/<soc>/<chart>) are keyed "<region>/<soc>/<chart>"
+                yield os.path.relpath(path, source_dir)[:-len(extension)].replace(os.sep, "/"), path
+
+
+def write_manifest(manifest, out_dir):
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def prune_payloads(manifest, out_dir):
+    """Delete payloads (and their .gz/.br variants) the manifest no longer references."""
+    current = {entry["file"] for entry in manifest.values()}
+    for file_name in os.listdir(out_dir):
+        base = file_name.removesuffix(".gz").removesuffix(".br")
+        if base.endswith(".json") and base != "manifest.json" and base not in current:
+            os.remove(os.path.join(out_dir, file_name))
+
+
+def update_manifest(entries, out_dir=compiled_dir):
+    """Merge freshly compiled entries into an existing manifest, dropping the payloads they replace."""
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    manifest.update(entries)
+    write_manifest(manifest, out_dir)
+    prune_payloads(manifest, out_dir)
+    return manifest
+
+
+def snapshot_layouts(combinations=None, out_dir=compiled_dir):
+    """Serialize dashboards (by default the default combination's) and return their manifest entries.
+
+    Run after the charts they embed are compiled and written to the manifest. Each entry records the chart revision
+    and model output hash it was taken from; the app ignores a snapshot once either has changed, until pipeline.py
+    or build_assets.py takes a new one.
+    """
+    import plotly.utils
+
+    import app
+    import data_store
+
+    combinations = combinations or [(data_store.default_selection["region"], data_store.default_selection["soc"])]
+    entries = {}
+    for region, soc in combinations:
+        payload = json.dumps(app.build_dashboard(region, soc), cls=plotly.utils.PlotlyJSONEncoder,
+                             separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()
+        file_name = f"layout.{region}.{soc}.{digest[:12]}.json"
+        if not os.path.exists(os.path.join(out_dir, file_name)):
+            write_variants(os.path.join(out_dir, file_name), payload)
+        entries[f"layouts/{region}/{soc}"] = {"file": file_name, "sha256": digest, "bytes": len(payload),
+                                              "app_sha256": app.app_source_sha256, "lazy_charts": app.lazy_charts,
+                                              "charts_revision": data_revision(),
+                                              "model_output_sha256": data_store.source_hash(region, soc)}
+    return entries
+
+
+def build(source_dir=assets_dir, out_dir=compiled_dir, json_dir=figures_dir, layouts=True):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    # Figure JSON (figures/<name>.json) takes precedence over an HTML export of the same name
+    sources = dict(_chart_sources(source_dir, ".html"))
+    sources.update(_chart_sources(json_dir, ".json"))
+    for name, path in sorted(sources.items()):
+        try:
+            name, entry = compile_figure(path, out_dir, name)
+        except ValueError as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        manifest[name] = entry
+        print(f"{name}: {entry['source_bytes']:,} -> {entry['bytes']:,} bytes")
+
+    # The app reads charts from the compiled folder, so snapshots can only be taken there
+    if layouts and out_dir == compiled_dir:
+        write_manifest(manifest, out_dir)
+        manifest.update(snapshot_layouts(out_dir=out_dir))
+
+    write_manifest(manifest, out_dir)
+    # Drop payloads left over from earlier builds
+    prune_payloads(manifest, out_dir)
+    precompress_assets(source_dir)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile chart exports into compact figure payloads")
+    parser.add_argument("--assets-dir", default=assets_dir)
+    parser.add_argument("--figures-dir", default=figures_dir)
+    parser.add_argument("--out-dir", default=compiled_dir)
+    parser.add_argument("--no-layouts", action="store_true", help="skip the dashboard layout snapshot")
+    args = parser.parse_args()
+    build(args.assets_dir, args.out_dir, args.figures_dir, not args.no_layouts)
@@ -0,0 +1,117 @@
+# Charts generated in-process from the simulation engine
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+
+from monte_carlo import monte_carlo_bands
+from simulation import default_params, simulate
+
+# Resolution of the what-if sliders; inputs are rounded to it so nearby settings share a cache entry
+whatif_steps = {"training_multiplier": 0.1, "mobility_multiplier": 0.1, "matching_efficiency": 0.01}
+
+# Scenarios shown in the shortage and employment comparisons, as overrides of simulation.default_params
+comparison_scenarios = {
+    "Baseline": {},
+    "Expanded Training (2x)": {"training_multiplier": 2.0},
+    "Expanded Mobility (2x)": {"mobility_multiplier": 2.0},
+    "Optimal (Training + Mobility)": {"training_multiplier": 2.0, "mobility_multiplier": 2.0},
+}
+
+
+def run_scenarios(scenarios=comparison_scenarios):
+    """Simulate a dict of named scenarios in one vectorized run."""
+    names = list(scenarios)
+    keys = {key for overrides in scenarios.values() for key in overrides} or {"training_multiplier"}
+    params = {key: [scenarios[name].get(key, default_params[key]) for name in names] for key in keys}
+    return names, simulate(**params)
+
+
+def shortage_comparison_figure(names=None, result=None):
+    if result is None:
+        names, result = run_scenarios()
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        fig.add_trace(go.Scatter(x=result["dates"], y=result["shortage"][i], mode="lines", name=name))
+    fig.update_layout(title="Monthly Shortage by Scenario", xaxis_title="Month", yaxis_title="Unfilled Positions",
+                      template="plotly_white", hovermode="x unified")
+    return fig
+
+
+def employment_comparison_figure(names=None, result=None):
+    if result is None:
+        names, result = run_scenarios()
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=result["dates"], y=result["target"][0], mode="lines", name="NC Commerce Projection",
+                             line={"dash": "dash", "color": "black"}))
+    for i, name in enumerate(names):
+        fig.add_trace(go.Scatter(x=result["dates"], y=result["employment"][i], mode="lines", name=name))
+    fig.update_layout(title="Employed Workforce by Scenario", xaxis_title="Month", yaxis_title="Employed Workers",
+                      template="plotly_white", hovermode="x unified")
+    return fig
+
+
+@lru_cache(maxsize=512)
+def _whatif_scenario(training, mobility, matching, base):
+    names = ["Baseline", "What-If"]
+    base = dict(base)
+    _, result = run_scenarios({
+        "Baseline": base,
+        "What-If": {**base, "training_multiplier": training, "mobility_multiplier": mobility,
+                    "matching_efficiency": matching},
+    })
+    summary = {
+        "avg_monthly_shortage": float(result["shortage"][1].mean()),
+        "total_cumulative_shortage": float(result["shortage"][1].sum()),
+        "baseline_avg_monthly_shortage": float(result["shortage"][0].mean()),
+    }
+    return (shortage_comparison_figure(names, result).to_plotly_json(),
+            employment_comparison_figure(names, result).to_plotly_json(),
+            summary)
+
+
+def whatif_scenario(training, mobility, matching, **base):
+    """Shortage and employment figures plus a summary for one slider setting, memoized in a bounded LRU.
+
+    base overrides the simulation defaults for both the baseline and the what-if run (e.g. initial_workforce).
+    """
+    values = {"training_multiplier": training, "mobility_multiplier": mobility, "matching_efficiency": matching}
+    key = tuple(round(round(values[name] / step) * step, 6) for name, step in whatif_steps.items())
+    return _whatif_scenario(*key, tuple(sorted(base.items())))
+
+
+@lru_cache(maxsize=32)
+def shortage_bands_figure(n_paths=5000, seed=2025, **overrides):
+    """Monthly shortage percentile bands (P10/P50/P90) from a seeded Monte Carlo run."""
+    bands = monte_carlo_bands(n_paths=n_paths, seed=seed, **overrides)
+    dates = simulate(months=bands["shortage"].shape[1])["dates"]
+    low, mid, high = bands["shortage"]
+    fig = go.Figure([
+        go.Scatter(x=dates, y=high, mode="lines", line={"width": 0}, name="P90", showlegend=False),
+        go.Scatter(x=dates, y=low, mode="lines", line={"width": 0}, fill="tonexty",
+                   fillcolor="rgba(231, 76, 60, 0.2)", name="P10-P90 range"),
+        go.Scatter(x=dates, y=mid, mode="lines", line={"color": "#e74c3c"}, name="Median (P50)"),
+    ])
+    p10, p50, p90 = bands["cumulative_shortage"]
+    fig.update_layout(title=f"Monthly Shortage Uncertainty ({n_paths:,} simulated paths)<br>"
+                            f"<sup>Cumulative shortage 2025-2030: {p50:,.0f} (P10 {p10:,.0f} - P90 {p90:,.0f})</sup>",
+                      xaxis_title="Month", yaxis_title="Unfilled Positions", template="plotly_white",
+                      hovermode="x unified")
+    return fig.to_plotly_json()
+
+
+def job_clusters_figure(index):
+    """2-D skill-similarity layout of job titles from a skill_index index, one trace per cluster."""
+    import skill_index
+
+    fig = go.Figure()
+    titles = np.array(index["titles"], dtype=object)
+    for cluster, label in enumerate(skill_index.cluster_labels(index)):
+        rows = np.flatnonzero(index["labels"] == cluster)
+        fig.add_trace(go.Scatter(x=index["embedding"][rows, 0], y=index["embedding"][rows, 1], mode="markers",
+                                 name=label, text=titles[rows], marker={"size": 5, "opacity": 0.7},
+                                 hovertemplate="%{text}<extra>" + label + "</extra>"))
+    fig.update_layout(title="Job Title Clusters by Skill Similarity", template="plotly_white",
+                      xaxis={"showticklabels": False, "title": None}, yaxis={"showticklabels": False, "title": None},
+                      legend={"orientation": "h", "y": -0.05})
+    return fig
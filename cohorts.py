@@ -0,0 +1,248 @@
+# Cohort engine: the workforce of every occupation in the state by single year of age, aged month by month
+#
+#   python cohorts.py profiles                  # age profiles from data/inputs/ipums_age_distribution.csv
+#   python cohorts.py project [--months 72] [--soc 49-9041 ...] [--out data/cohorts/projection.npz]
+#
+# The IPUMS extract (microdata with OCCSOC, AGE and PERWT, optionally STATEFIP and EMPSTAT, or pre-aggregated
+# soc, age, count rows) is reduced with one bincount to an (occupation x age) array of weighted counts and saved
+# with the hash of the extract, so a new extract only re-runs that reduction. Occupations with a thin sample are
+# shrunk towards the pooled age profile of all occupations.
+#
+# Projections hold every occupation at once as (occupation x age) arrays and step them together: vectorized
+# retirement hazards and transfers, a twelfth of each cohort ageing a year every month, and entrants refilling
+# employment to its projected path. Hundreds of occupations cost about the same as one; results are stored as
+# float32 (month x occupation [x age]) arrays.
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics import data_dir, file_hash
+from simulation import (ages, default_params, entrant_age_distribution, horizon_months, monthly_retirement_hazard,
+                        start_month)
+
+cohorts_dir = os.path.join(data_dir, "cohorts")
+extract_path = os.path.join(data_dir, "inputs", "ipums_age_distribution.csv")
+
+# Occupation employment totals: soc, base_employment and projected_employment (end of the horizon)
+projections_path = os.path.join(data_dir, "inputs", "occupation_projections.csv")
+
+# Microdata filters: North Carolina residents who are employed
+state_fips = 37
+employed_status = 1
+
+# Sample records at which an occupation's own age profile and the pooled profile get equal weight
+prior_records = 30
+
+
+def soc_codes(values):
+    """SOC codes as "49-9041", from IPUMS OCCSOC ("499041") or already hyphenated codes."""
+    codes = pd.Series(values, dtype=str).str.strip().str.replace("-", "", regex=False)
+    return (codes.str[:2] + "-" + codes.str[2:]).to_numpy(dtype=str)
+
+
+def read_extract(path=extract_path):
+    """(socs, weighted counts (occupation x age), sample records per occupation) of an IPUMS extract."""
+    columns = set(pd.read_csv(path, nrows=0).columns)
+    if {"OCCSOC", "AGE", "PERWT"} <= columns:
+        filters = [column for column in ("STATEFIP", "EMPSTAT") if column in columns]
+        frame = pd.read_csv(path, usecols=["OCCSOC", "AGE", "PERWT", *filters], dtype={"OCCSOC": str})
+        if "STATEFIP" in filters:
+            frame = frame[frame["STATEFIP"] == state_fips]
+        if "EMPSTAT" in filters:
+            frame = frame[frame["EMPSTAT"] == employed_status]
+        soc, age, weight = frame["OCCSOC"], frame["AGE"], frame["PERWT"]
+    else:
+        frame = pd.read_csv(path, usecols=["soc", "age", "count"], dtype={"soc": str})
+        soc, age, weight = frame["soc"], frame["age"], frame["count"]
+
+    age = age.to_numpy()
+    keep = (age >= ages[0]) & (age <= ages[-1]) & soc.notna().to_numpy()
+    socs, occupation = np.unique(soc_codes(soc.to_numpy()[keep]), return_inverse=True)
+    cells = occupation * ages.size + (age[keep] - ages[0])
+    counts = np.bincount(cells, weights=weight.to_numpy(dtype=float)[keep], minlength=socs.size * ages.size)
+    return socs, counts.reshape(socs.size, ages.size), np.bincount(occupation, minlength=socs.size)
+
+
+def age_profiles(counts, samples):
+    """Age shares per occupation, shrunk towards the pooled profile the thinner the occupation's sample."""
+    pooled = counts.sum(axis=0) / counts.sum()
+    totals = counts.sum(axis=1, keepdims=True)
+    own = np.divide(counts, totals, out=np.tile(pooled, (counts.shape[0], 1)), where=totals > 0)
+    trust = (samples / (samples + prior_records))[:, None]
+    return trust * own + (1 - trust) * pooled
+
+
+def build_profiles(path=extract_path):
+    socs, counts, samples = read_extract(path)
+    return {"socs": socs, "counts": counts, "samples": samples, "shares": age_profiles(counts, samples),
+            "source_sha256": file_hash(path)}
+
+
+def save_profiles(profiles, directory=cohorts_dir):
+    os.makedirs(directory, exist_ok=True)
+    np.savez(os.path.join(directory, "profiles.npz"), socs=profiles["socs"], counts=profiles["counts"],
+             samples=profiles["samples"])
+    with open(os.path.join(directory, "profiles.json"), "w") as f:
+        json.dump({"source_sha256": profiles["source_sha256"], "occupations": int(profiles["socs"].size)}, f,
+                  indent=2)
+
+
+def load_profiles(directory=cohorts_dir):
+    if not os.path.exists(os.path.join(directory, "profiles.json")):
+        return None
+    with open(os.path.join(directory, "profiles.json")) as f:
+        meta = json.load(f)
+    arrays = np.load(os.path.join(directory, "profiles.npz"))
+    return {"socs": arrays["socs"], "counts": arrays["counts"], "samples": arrays["samples"],
+            "shares": age_profiles(arrays["counts"], arrays["samples"]), "source_sha256": meta["source_sha256"]}
+
+
+def refresh_profiles(path=extract_path, directory=cohorts_dir):
+    """Saved profiles, rebuilt only when the extract has changed."""
+    profiles = load_profiles(directory)
+    if profiles is None or profiles["source_sha256"] != file_hash(path):
+        profiles = build_profiles(path)
+        save_profiles(profiles, directory)
+    return profiles
+
+
+def age_distribution(soc, profiles=None):
+    """One occupation's age shares for simulation.simulate, or None when the extract does not cover it."""
+    profiles = load_profiles() if profiles is None else profiles
+    if profiles is None or soc not in profiles["socs"]:
+        return None
+    return profiles["shares"][np.searchsorted(profiles["socs"], soc)]
+
+
+def reweight(employed, shares):
+    """Cohorts (occupation x age) redistributed over ages by new shares, keeping each occupation's total."""
+    return employed.sum(axis=1, keepdims=True) * shares
+
+
+def retirement_hazard(n_occupations, scale=1.0):
+    """Monthly retirement hazard (occupation x age); scale is a scalar or one multiplier per occupation."""
+    scale = np.broadcast_to(np.asarray(scale, dtype=float).reshape(-1, 1), (n_occupations, 1))
+    return monthly_retirement_hazard()[None, :] * scale
+
+
+def linear_target(base, projected, months=horizon_months):
+    """Employment path (occupation x month) from base to projected along the horizon."""
+    base, projected = np.asarray(base, dtype=float), np.asarray(projected, dtype=float)
+    return base[:, None] + np.outer(projected - base, np.arange(1, months + 1) / months)
+
+
+def project(employed, months=horizon_months, hazard=None, transfer_rate=default_params["transfer_rate"],
+            target=None, entrants=None, keep_ages=True):
+    """Step every occupation's cohorts forward month by month.
+
+    employed is (occupation x age); target, when given, is the (occupation x month) employment that entrants
+    (aged by the entrants distribution) refill to after each month's exits, otherwise cohorts are closed. Returns a
+    dict of float32 (month x occupation) arrays: employment, retirements, transfers_out and entrants, plus
+    initial_employment per occupation and employment_by_age (month x occupation x age) when keep_ages is set.
+    """
+    employed = np.array(employed, dtype=float)
+    n = employed.shape[0]
+    hazard = retirement_hazard(n) if hazard is None else hazard
+    transfer_rate = np.broadcast_to(np.asarray(transfer_rate, dtype=float).reshape(-1, 1), (n, 1))
+    entrants = entrant_age_distribution() if entrants is None else entrants
+
+    out = {name: np.empty((months, n), dtype=np.float32)
+           for name in ("employment", "retirements", "transfers_out", "entrants")}
+    out["initial_employment"] = employed.sum(axis=1).astype(np.float32)
+    if keep_ages:
+        out["employment_by_age"] = np.empty((months, n, ages.size), dtype=np.float32)
+
+    for t in range(months):
+        retirements = employed * hazard
+        transfers = employed * transfer_rate
+        employed -= retirements + transfers
+
+        # Birthdays are spread over the year: a twelfth of each cohort moves up one year, the oldest leave
+        ageing = employed / 12
+        employed -= ageing
+        employed[:, 1:] += ageing[:, :-1]
+
+        hires = np.maximum(target[:, t] - employed.sum(axis=1), 0) if target is not None else np.zeros(n)
+        employed += hires[:, None] * entrants[None, :]
+
+        out["employment"][t] = employed.sum(axis=1)
+        out["retirements"][t] = retirements.sum(axis=1) + ageing[:, -1]
+        out["transfers_out"][t] = transfers.sum(axis=1)
+        out["entrants"][t] = hires
+        if keep_ages:
+            out["employment_by_age"][t] = employed
+
+    out["dates"] = pd.period_range(start_month, periods=months, freq="M").to_timestamp()
+    return out
+
+
+def read_projections(path=projections_path):
+    """Base and projected employment by SOC code, or None without a projections file."""
+    if not os.path.exists(path):
+        return None
+    frame = pd.read_csv(path, usecols=["soc", "base_employment", "projected_employment"], dtype={"soc": str})
+    frame["soc"] = soc_codes(frame["soc"])
+    return frame.set_index("soc")
+
+
+def statewide(profiles, projections=None, socs=None, months=horizon_months, **params):
+    """Project all occupations (or socs) in one pass.
+
+    Employment starts from the projections' base (else the extract's weighted counts) spread over the age profile,
+    and follows the projected path (else is held at its base, so entrants replace exits).
+    """
+    selected = np.isin(profiles["socs"], socs) if socs else np.ones(profiles["socs"].size, dtype=bool)
+    names, shares = profiles["socs"][selected], profiles["shares"][selected]
+    base = profiles["counts"][selected].sum(axis=1)
+    projected = base
+    if projections is not None:
+        matched = projections.reindex(names)
+        base = matched["base_employment"].fillna(pd.Series(base, index=names)).to_numpy(dtype=float)
+        projected = matched["projected_employment"].fillna(pd.Series(base, index=names)).to_numpy(dtype=float)
+    result = project(base[:, None] * shares, months, target=linear_target(base, projected, months), **params)
+    result["socs"] = names
+    return result
+
+
+def save_projection(result, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    arrays = {name: value for name, value in result.items() if isinstance(value, np.ndarray)}
+    np.savez_compressed(path, dates=np.asarray(result["dates"].strftime("%Y-%m")), **arrays)
+
+
+def summary(result):
+    """Per-occupation totals over the horizon, most retirements first."""
+    frame = pd.DataFrame({
+        "initial_employment": result["initial_employment"],
+        "final_employment": result["employment"][-1],
+        "retirements": result["retirements"].sum(axis=0),
+        "transfers_out": result["transfers_out"].sum(axis=0),
+        "entrants": result["entrants"].sum(axis=0),
+    }, index=pd.Index(result["socs"], name="soc"))
+    return frame.sort_values("retirements", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Occupation cohorts by single year of age")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("profiles", help="age profiles from the IPUMS extract")
+    run = commands.add_parser("project", help="project every occupation's cohorts")
+    run.add_argument("--months", type=int, default=horizon_months)
+    run.add_argument("--soc", nargs="*", help="only these SOC codes")
+    run.add_argument("--out", default=os.path.join(cohorts_dir, "projection.npz"))
+    args = parser.parse_args()
+
+    profiles = refresh_profiles()
+    if args.command == "profiles":
+        print(f"{profiles['socs'].size:,} occupations, {profiles['samples'].sum():,} records")
+        raise SystemExit
+
+    start = time.perf_counter()
+    result = statewide(profiles, read_projections(), args.soc, args.months)
+    print(f"{result['socs'].size:,} occupations x {args.months} months in {time.perf_counter() - start:.2f}s")
+    save_projection(result, args.out)
+    print(summary(result).head(15).round(0).to_string())
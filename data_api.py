@@ -0,0 +1,223 @@
+# Chart data API: each chart's series by key and date range, as JSON, streamed NDJSON or Arrow
+#
+#   GET /api/charts                          chart keys, with content-hash URLs of their stored files
+#   GET /api/charts/<key>/series             ?start=2024-01&end=2030-12&region=&soc=&format=ndjson|json|arrow
+#
+# Series are read from the figure store (compiled payloads, figure JSON or HTML exports), so the numbers match the
+# dashboard. The streamed formats send the newest months first, in windows of chunk_months, each window as its own
+# NDJSON line or Arrow record batch; a client draws the latest window as soon as it arrives and prepends the earlier
+# history as it fills in. Series without a date axis (bar categories) are sent whole in the first window and ignore
+# start/end. pyarrow is only needed for format=arrow.
+import hashlib
+import io
+import json
+import os
+from functools import lru_cache
+
+from flask import Response, abort, jsonify, request, stream_with_context
+
+from figure_store import assets_dir, chart_names, data_revision, load_figure, load_manifest, resolve_chart
+from static_assets import asset_url, compiled_url
+
+# Months of every series per streamed chunk
+chunk_months = 12
+
+# Charts kept as extracted series, per process
+series_cache_size = 64
+
+formats = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+@lru_cache(maxsize=series_cache_size)
+def chart_series(key, revision=None):
+    """Traces of a chart that have x and y, as dicts of name, type, x (datetime64 or categories) and y (floats).
+
+    revision is the store's data_revision(), so series are extracted again once the chart is recompiled.
+    """
+    import numpy as np
+
+    from downsample import iso_dates
+
+    series = []
+    for i, trace in enumerate(load_figure(key).data):
+        if getattr(trace, "x", None) is None or getattr(trace, "y", None) is None:
+            continue
+        x, y = np.asarray(trace.x), np.asarray(trace.y)
+        if y.dtype.kind not in "iuf":
+            x, y = y, x  # horizontal bars: the numbers are on x
+        try:
+            y = y.astype(float)
+        except (TypeError, ValueError):
+            continue
+        dates = iso_dates(x)
+        if dates is None and x.dtype.kind not in "iuf":
+            x = x.astype(str)
+        series.append({"name": trace.name or f"trace {i}", "type": trace.type,
+                       "x": x if dates is None else dates, "y": y})
+    return series
+
+
+def _parse_date(value):
+    import numpy as np
+
+    if not value:
+        return None
+    try:
+        return np.datetime64(value, "ns")
+    except ValueError:
+        abort(400, f"invalid date {value!r}, expected YYYY-MM or YYYY-MM-DD")
+
+
+def select_range(series, start=None, end=None):
+    """Series restricted to [start, end] (inclusive); series without dates are kept whole."""
+    import numpy as np
+
+    selected = []
+    for item in series:
+        if item["x"].dtype.kind != "M":
+            selected.append(item)
+            continue
+        mask = np.ones(len(item["x"]), dtype=bool)
+        if start is not None:
+            mask &= item["x"] >= start
+        if end is not None:
+            mask &= item["x"] <= end
+        selected.append({**item, "x": item["x"][mask], "y": item["y"][mask]})
+    return selected
+
+
+def windows(series):
+    """(window, [(series index, x, y) ...]) newest first, each window spanning chunk_months months."""
+    import numpy as np
+
+    dated = [item["x"].astype("datetime64[M]").astype(int) for item in series if item["x"].dtype.kind == "M"]
+    latest = max((months.max() for months in dated if months.size), default=0)
+    numbers = []
+    for item in series:
+        if item["x"].dtype.kind == "M":
+            numbers.append((latest - item["x"].astype("datetime64[M]").astype(int)) // chunk_months)
+        else:
+            numbers.append(np.zeros(len(item["x"]), dtype=int))
+    last = max((number.max() for number in numbers if number.size), default=-1)
+    for window in range(last + 1):
+        parts = []
+        for i, (item, number) in enumerate(zip(series, numbers)):
+            mask = number == window
+            if mask.any():
+                parts.append((i, item["x"][mask], item["y"][mask]))
+        if parts:
+            yield window, parts
+
+
+def _json_values(x, y):
+    import numpy as np
+
+    x = np.datetime_as_string(x, unit="D").tolist() if x.dtype.kind == "M" else x.tolist()
+    return x, [None if np.isnan(value) else value for value in y.tolist()]
+
+
+def _header(key, series):
+    return {"chart": key, "order": "newest-first", "chunk_months": chunk_months,
+            "series": [{"name": item["name"], "type": item["type"], "points": len(item["y"])} for item in series]}
+
+
+def stream_ndjson(key, series):
+    yield json.dumps(_header(key, series)) + "\n"
+    for window, parts in windows(series):
+        for i, x, y in parts:
+            x, y = _json_values(x, y)
+            yield json.dumps({"window": int(window), "series": i, "x": x, "y": y}) + "\n"
+
+
+def stream_arrow(key, series):
+    """Arrow IPC stream: one record batch (series, x, y) per window; x is a timestamp when every series is dated."""
+    import pyarrow as pa
+
+    dated = all(item["x"].dtype.kind == "M" for item in series)
+    schema = pa.schema([("series", pa.string()), ("x", pa.timestamp("ns") if dated else pa.string()),
+                        ("y", pa.float64())], metadata={"chart": key, "order": "newest-first"})
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for _, parts in windows(series):
+        names = [series[i]["name"] for i, x, _ in parts for _ in range(len(x))]
+        x = [value for _, part_x, _ in parts for value in (part_x if dated else part_x.astype(str))]
+        y = [value for _, _, part_y in parts for value in part_y]
+        writer.write_batch(pa.record_batch([pa.array(names, pa.string()), pa.array(x, schema.field("x").type),
+                                            pa.array(y, pa.float64())], schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+def _etag(key, args):
+    # Compiled charts carry a content hash; the same query over the same payload is the same response
+    entry = load_manifest().get(key)
+    if entry is None:
+        return None
+    query = json.dumps(sorted(args.items()))
+    return hashlib.sha256(f"{entry['sha256']}{query}".encode()).hexdigest()[:16]
+
+
+def chart_files(name):
+    """Content-hash URLs (cacheable for a year) of a chart's compiled payload and HTML export, where it has them."""
+    files = {}
+    compiled = compiled_url(name)
+    if compiled:
+        files["compiled"] = compiled
+    if os.path.exists(os.path.join(assets_dir, f"{name}.html")):
+        files["html"] = asset_url(assets_dir, f"{name}.html")
+    return files
+
+
+def chart_response(key):
+    region, soc = request.args.get("region"), request.args.get("soc")
+    key = resolve_chart(key, region, soc)
+    # Only names the store lists: URL segments and query parameters never become arbitrary file paths
+    if key not in chart_names():
+        abort(404, f"no chart {key!r}")
+    data_format = request.args.get("format", "ndjson")
+    if data_format not in formats:
+        abort(400, f"format must be one of {', '.join(formats)}")
+    if data_format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            abort(406, "format=arrow needs pyarrow on the server")
+
+    etag = _etag(key, request.args)
+    if etag is not None and etag in request.if_none_match:
+        return Response(status=304, headers={"ETag": f'"{etag}"'})
+    series = select_range(chart_series(key, data_revision()), _parse_date(request.args.get("start")),
+                          _parse_date(request.args.get("end")))
+    if data_format == "json":
+        response = jsonify({**_header(key, series), "order": "ascending", "series": [
+            {"name": item["name"], "type": item["type"],
+             **dict(zip(("x", "y"), _json_values(item["x"], item["y"])))} for item in series]})
+    else:
+        stream = stream_ndjson if data_format == "ndjson" else stream_arrow
+        response = Response(stream_with_context(stream(key, series)), mimetype=formats[data_format])
+    if etag is not None:
+        response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response
+
+
+def register_data_api(app):
+    """Serve the chart data API on app.server."""
+    server = app.server
+
+    @server.route("/api/charts")
+    def list_charts():
+        names = chart_names()
+        files = {name: chart_files(name) for name in names}
+        return jsonify({"charts": names, "files": {name: urls for name, urls in files.items() if urls}})
+
+    @server.route("/api/charts/<path:key>/series")
+    def chart_data(key):
+        return chart_response(key)
@@ -0,0 +1,129 @@
+# Data store for the (region, SOC code) combinations the dashboard can show
+#
+# data/catalog.csv lists the combinations (region, soc, region_name, occupation_name). Model output lives in a
+# Parquet dataset partitioned by the same keys (data/model_output/region=<region>/soc=<soc>/*.parquet), so a page
+# only ever reads the slice it shows. Per-combination caches are bounded, keeping memory flat however many
+# combinations are hosted.
+import hashlib
+import os
+from functools import lru_cache
+
+from metrics import compute_key_metrics, data_dir, file_hash, find_model_output, kpi_dict, read_key_metrics
+
+catalog_path = os.path.join(data_dir, "catalog.csv")
+model_output_dataset = os.path.join(data_dir, "model_output")
+
+# The original dashboard; also served at / and used when no catalog has been dropped in
+default_selection = {
+    "region": "charlotte",
+    "soc": "49-9041",
+    "region_name": "Charlotte",
+    "occupation_name": "Industrial Machinery Mechanics",
+}
+
+# Combinations kept in memory at once
+slice_cache_size = 32
+
+
+def _stamp(path):
+    """Cache key that changes when a file is replaced, or when any file in a directory (a partition) is added,
+    removed or rewritten; a directory's own mtime and size do not change when a file in it is overwritten."""
+    if not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                            for entry in os.scandir(path) if entry.is_file()))
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=4)
+def _load_catalog(stamp):
+    import pandas as pd
+
+    if stamp is None:
+        return pd.DataFrame([default_selection]).set_index(["region", "soc"])
+    return pd.read_csv(catalog_path, dtype=str).set_index(["region", "soc"]).sort_index()
+
+
+def catalog():
+    """All combinations, indexed by (region, soc)."""
+    return _load_catalog(_stamp(catalog_path))
+
+
+def selection(region=None, soc=None):
+    """Names for a combination, or None if it is not in the catalog; no arguments means the default."""
+    region = region or default_selection["region"]
+    soc = soc or default_selection["soc"]
+    if _stamp(catalog_path) is None:  # single-combination deployment; answered without loading pandas
+        return dict(default_selection) if (region, soc) == (default_selection["region"],
+                                                           default_selection["soc"]) else None
+    try:
+        row = catalog().loc[(region, soc)]
+    except KeyError:
+        return None
+    return {"region": region, "soc": soc, **row.to_dict()}
+
+
+def parse_path(pathname):
+    """Split a /<region>/<soc> URL path; / gives the default combination."""
+    parts = [part for part in (pathname or "/").split("/") if part]
+    if not parts:
+        return selection()
+    if len(parts) != 2:
+        return None
+    return selection(*parts)
+
+
+def page_path(region, soc):
+    return f"/{region}/{soc}"
+
+
+def _partition(region, soc):
+    return os.path.join(model_output_dataset, f"region={region}", f"soc={soc}")
+
+
+@lru_cache(maxsize=slice_cache_size)
+def _model_output_slice(region, soc, stamp):
+    import pandas as pd
+
+    return pd.read_parquet(_partition(region, soc))
+
+
+def model_output(region, soc):
+    """The model output rows of one combination, read from its partition only."""
+    if not os.path.isdir(_partition(region, soc)):
+        return None
+    return _model_output_slice(region, soc, _stamp(_partition(region, soc)))
+
+
+@lru_cache(maxsize=slice_cache_size)
+def _key_metrics(region, soc, stamp):
+    frame = model_output(region, soc)
+    if frame is None or frame.empty:
+        return {}
+    return kpi_dict(compute_key_metrics(frame))
+
+
+def key_metrics(region, soc):
+    """KPIs for one combination; the single-file model output still applies to the default combination."""
+    if os.path.isdir(model_output_dataset):
+        return dict(_key_metrics(region, soc, _stamp(_partition(region, soc))))
+    if (region, soc) == (default_selection["region"], default_selection["soc"]) and find_model_output():
+        return read_key_metrics()
+    return {}
+
+
+def source_hash(region, soc):
+    """Content hash of the model output a combination's numbers come from, or None when it has none."""
+    if os.path.isdir(model_output_dataset):
+        partition = _partition(region, soc)
+        if not os.path.isdir(partition):
+            return None
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(partition)):
+            digest.update(f"{name}:{file_hash(os.path.join(partition, name))}".encode())
+        return digest.hexdigest()
+    if (region, soc) == (default_selection["region"], default_selection["soc"]) and find_model_output():
+        return file_hash(find_model_output())
+    return None
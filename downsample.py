@@ -0,0 +1,199 @@
+# Server-side downsampling for dense charts: largest-triangle-three-buckets for lines, density binning for scatter
+#
+# A chart is sent at roughly one point per horizontal pixel; when the user zooms (relayoutData), only the points
+# inside the visible range are downsampled again, so detail returns as the range narrows. Charts too large for SVG
+# even then are switched to the WebGL trace types.
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Points per trace for each pixel of viewport width, and the width assumed before the browser reports one
+points_per_pixel = 1.0
+default_viewport_width = 1200
+
+# Points (or heatmap cells) above which a chart is drawn with WebGL traces
+webgl_threshold = int(os.environ.get("WEBGL_THRESHOLD", 5000))
+
+# Grid cells of the scatter density binning, per point of the line budget (markers are cheaper to draw than lines)
+scatter_cells_per_point = 4
+
+
+def iso_dates(values):
+    """values as datetime64[ns] if they are dates or ISO 8601 strings, else None (categories).
+
+    Only ISO 8601 is tried: letting pandas guess the format falls back to parsing every label one by one (and warns
+    on each request) when the axis is categorical.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[ns]")
+    if arr.dtype.kind not in "OU" or arr.size == 0:
+        return None
+    dates = pd.to_datetime(arr.ravel(), format="ISO8601", errors="coerce")
+    if (dates.isna() & pd.notna(arr.ravel())).any():
+        return None
+    return dates.to_numpy().reshape(arr.shape)
+
+
+def _numeric(values):
+    """Float positions for x or y values, which may be numbers or date strings; None if categorical."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iuf":
+        return arr.astype(float)
+    dates = iso_dates(arr)
+    return None if dates is None else dates.astype("int64").astype(float)
+
+
+def lttb(x, y, n_out):
+    """Indices of the n_out points largest-triangle-three-buckets keeps from the series (x, y)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third vertex of the triangle
+        cx, cy = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def density_bin(x, y, x_range, y_range, n_out):
+    """Indices of one representative point per occupied cell of a grid of about n_out cells."""
+    bins = max(int(np.sqrt(n_out)), 1)
+    ix = np.clip(((x - x_range[0]) / (x_range[1] - x_range[0] or 1) * bins).astype(int), 0, bins - 1)
+    iy = np.clip(((y - y_range[0]) / (y_range[1] - y_range[0] or 1) * bins).astype(int), 0, bins - 1)
+    _, first = np.unique(ix * bins + iy, return_index=True)
+    return np.sort(first)
+
+
+def _take(value, keep):
+    return value[keep] if isinstance(value, np.ndarray) else [value[i] for i in keep]
+
+
+def _select(trace, keep):
+    """Subset every per-point array of a trace (coordinates, hover text, customdata, marker colors and sizes)."""
+    n = len(trace["x"])
+    for key, value in list(trace.items()):
+        if isinstance(value, (list, tuple, np.ndarray)) and len(value) == n:
+            trace[key] = _take(value, keep)
+        elif key == "marker" and isinstance(value, dict):
+            trace[key] = {k: _take(v, keep) if isinstance(v, (list, tuple, np.ndarray)) and len(v) == n else v
+                          for k, v in value.items()}
+
+
+def _visible(values, value_range):
+    """Mask of the values inside an axis range, and the range as floats."""
+    bounds = _numeric(list(value_range))
+    return (values >= bounds[0]) & (values <= bounds[1]), bounds
+
+
+def downsample_trace(trace, max_points, x_range=None, y_range=None):
+    """Copy of a scatter trace reduced to about max_points points within the visible ranges."""
+    trace = dict(trace)
+    if trace.get("type", "scatter") not in ("scatter", "scattergl") or trace.get("x") is None \
+            or trace.get("y") is None:
+        return trace
+    xs, ys = _numeric(trace["x"]), _numeric(trace["y"])
+    if xs is None or ys is None or len(xs) != len(ys) or len(xs) <= max_points and x_range is None:
+        return trace
+
+    if "lines" in trace.get("mode", "lines"):
+        # Lines are cut to the x range only, keeping one point either side so they run to the plot edges
+        visible = np.arange(len(xs))
+        if x_range is not None:
+            inside = np.flatnonzero(_visible(xs, x_range)[0])
+            visible = np.arange(max(inside[0] - 1, 0), min(inside[-1] + 2, len(xs))) if inside.size else inside
+        keep = visible[lttb(xs[visible], ys[visible], max_points)]
+    else:
+        mask, x_bounds, y_bounds = np.ones(len(xs), dtype=bool), (xs.min(), xs.max()), (ys.min(), ys.max())
+        if x_range is not None:
+            inside, x_bounds = _visible(xs, x_range)
+            mask &= inside
+        if y_range is not None:
+            inside, y_bounds = _visible(ys, y_range)
+            mask &= inside
+        visible = np.flatnonzero(mask)
+        cells = max_points * scatter_cells_per_point
+        keep = visible if visible.size <= max_points else \
+            visible[density_bin(xs[visible], ys[visible], x_bounds, y_bounds, cells)]
+    if len(keep) < len(xs):
+        _select(trace, keep)
+    return trace
+
+
+def downsample_figure(figure, viewport_width=None, x_range=None, y_range=None, uirevision=None):
+    """Downsampled copy of a figure (dict or go.Figure) for a viewport width and, when zoomed, the visible ranges."""
+    figure = _as_dict(figure)
+    max_points = int((viewport_width or default_viewport_width) * points_per_pixel)
+    layout = copy.deepcopy(figure.get("layout", {}))
+    # A constant uirevision keeps the user's zoom when the downsampled figure replaces the current one
+    if uirevision is not None:
+        layout["uirevision"] = uirevision
+    return {"data": [downsample_trace(trace, max_points, x_range, y_range) for trace in figure.get("data", [])],
+            "layout": layout}
+
+
+def relayout_ranges(relayout_data):
+    """(x_range, y_range) zoomed to in a dcc.Graph relayoutData event, (None, None) when the zoom was reset,
+    or None when the event did not change the axes (e.g. the initial autosize)."""
+    relayout_data = relayout_data or {}
+    if relayout_data.get("xaxis.autorange") or relayout_data.get("yaxis.autorange"):
+        return None, None
+    ranges = []
+    for axis in ("xaxis", "yaxis"):
+        if f"{axis}.range[0]" in relayout_data:
+            ranges.append((relayout_data[f"{axis}.range[0]"], relayout_data[f"{axis}.range[1]"]))
+        elif f"{axis}.range" in relayout_data:
+            ranges.append(tuple(relayout_data[f"{axis}.range"]))
+        else:
+            ranges.append(None)
+    return None if ranges == [None, None] else tuple(ranges)
+
+
+def _as_dict(figure):
+    return figure.to_plotly_json() if hasattr(figure, "to_plotly_json") else figure
+
+
+def _heatmap_hover_text(trace):
+    """Per-cell hover text for heatmapgl, which has no hovertemplate: row, column and value."""
+    if trace.get("hovertext") is not None:
+        return trace["hovertext"]
+    z = np.asarray(trace["z"], dtype=float)
+    rows = trace.get("y") if trace.get("y") is not None else range(z.shape[0])
+    columns = trace.get("x") if trace.get("x") is not None else range(z.shape[1])
+    return [[f"{row}<br>{column}<br>{value:.3g}" for column, value in zip(columns, values)]
+            for row, values in zip(rows, z)]
+
+
+def webgl_figure(figure, threshold=None):
+    """Copy of a figure with scatter and heatmap traces switched to scattergl/heatmapgl when it has more than
+    threshold points; hover text (titles, cluster names) is kept."""
+    figure = _as_dict(figure)
+    threshold = webgl_threshold if threshold is None else threshold
+    traces = [dict(trace) for trace in figure.get("data", [])]
+    # All scatter traces switch together so SVG and WebGL layers don't draw out of order
+    scatter_points = sum(len(trace["x"]) for trace in traces
+                         if trace.get("type", "scatter") == "scatter" and trace.get("x") is not None)
+    for trace in traces:
+        kind = trace.get("type", "scatter")
+        if kind == "scatter" and scatter_points > threshold:
+            valid = go.Scattergl()._valid_props
+            trace.update(type="scattergl")
+        elif kind == "heatmap" and trace.get("z") is not None and np.size(trace["z"]) > threshold:
+            valid = go.Heatmapgl()._valid_props
+            trace.update(type="heatmapgl", text=_heatmap_hover_text(trace), hoverinfo="text")
+        else:
+            continue
+        for key in set(trace) - valid - {"type"}:
+            del trace[key]  # e.g. cliponaxis, texttemplate: not supported by the WebGL types
+    return {"data": traces, "layout": figure.get("layout", {})}
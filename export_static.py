@@ -0,0 +1,262 @@
+# Static-site export: renders every dashboard into a folder that any static file host or object store can serve
+#
+#   python export_static.py [--out-dir site] [--base-url /] [region/soc ...]
+#
+# The Dash renderer fetches a page's component tree from <requests_pathname_prefix>_dash-layout and its callbacks
+# from <prefix>_dash-dependencies, and only accepts them served as application/json. Both are written as
+# data/<hash>/layout.json and dependencies.json, which hosts serve with that type, each page's index.html points its
+# prefix at data/<hash>/ and a small script in the page redirects the renderer's two requests to the .json files.
+# With no server behind the bundle:
+#   - every chart is inlined at full resolution (tabs can't load lazily and zooming can't fetch detail),
+#   - the what-if and uncertainty panels show their outputs for the default settings, with the controls disabled,
+#   - only clientside callbacks are kept.
+# Scripts, stylesheets and page data are written under content-hashed names and can be cached forever; only the
+# index.html files need revalidating. Plotly.js ships once, as dcc's own async chunk: the standalone chart exports
+# in assets/ each embed a copy and are not copied. Text files get .gz siblings (and .br when brotli is installed)
+# for hosts that serve precompressed files.
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from build_assets import compressible_extensions, write_compressed
+
+# Page data files, by the name the Dash renderer requests them under
+page_files = {"_dash-layout": "layout.json", "_dash-dependencies": "dependencies.json"}
+
+# Sends the renderer's page data requests to the files above; runs before the renderer, right after its config
+_page_data_script = """<script>
+(function () {
+    var files = %s;
+    var prefix = JSON.parse(document.getElementById("_dash-config").textContent).requests_pathname_prefix;
+    var fetch = window.fetch;
+    window.fetch = function (url, init) {
+        if (typeof url === "string" && url.indexOf(prefix) === 0 && files[url.slice(prefix.length)]) {
+            url = prefix + files[url.slice(prefix.length)];
+        }
+        return fetch.call(this, url, init);
+    };
+})();
+</script>"""
+
+# Local script, stylesheet and icon references in the index page
+_local_url = re.compile(r'(?P<attr>src|href)="(?P<url>/[^"]*)"')
+_dash_config = re.compile(r'(<script id="_dash-config" type="application/json">)(.*?)(</script>)', re.S)
+
+# Controls whose callbacks need the server; disabled in the export
+whatif_sliders = ("whatif-training", "whatif-mobility", "whatif-matching")
+
+
+def _digest(payload):
+    return hashlib.sha256(payload).hexdigest()[:12]
+
+
+def _plain(obj):
+    """Components and figures as plain JSON data."""
+    import plotly.utils
+
+    return json.loads(json.dumps(obj, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def _components(node):
+    """Every component in a serialized component tree."""
+    if isinstance(node, list):
+        for child in node:
+            yield from _components(child)
+    elif isinstance(node, dict) and "props" in node:
+        yield node
+        yield from _components(node["props"].get("children"))
+
+
+def _full_figure(frame_id, region, soc):
+    import app
+    from downsample import webgl_figure
+
+    figure = app.load_chart(app.chart_sources[frame_id], region, soc)
+    return webgl_figure(figure) if frame_id in app.webgl_charts else figure
+
+
+def static_layout(region, soc):
+    """The app layout routed to one dashboard, with the outputs of its server-side callbacks filled in."""
+    import app
+
+    selection = {"region": region, "soc": soc}
+    layout = _plain(app.app.layout)
+    components = {node["props"]["id"]: node for node in _components(layout) if "id" in node["props"]}
+    components["page-content"]["props"]["children"] = _plain(app.build_dashboard(region, soc))
+    components["selection"]["props"]["data"] = selection
+    components = {node["props"]["id"]: node for node in _components(layout) if "id" in node["props"]}
+
+    for frame_id in app.chart_sources:
+        if frame_id in components:
+            components[frame_id]["props"]["figure"] = _plain(_full_figure(frame_id, region, soc))
+
+    shortage, employment, summary = app.update_whatif(
+        *(components[slider]["props"]["value"] for slider in whatif_sliders), selection)
+    components["whatif-shortage"]["props"]["figure"] = _plain(shortage)
+    components["whatif-employment"]["props"]["figure"] = _plain(employment)
+    components["whatif-summary"]["props"]["children"] = _plain(summary)
+    for slider in whatif_sliders:
+        components[slider]["props"]["disabled"] = True
+
+    # Every tab's charts are already on the page, so the browser-side tab loader has nothing to fetch
+    for tabs_id, tabs in app.tab_charts.items():
+        if f"{tabs_id}-loaded" in components:
+            components[f"{tabs_id}-loaded"]["props"]["data"] = list(tabs)
+
+    components["shortage-bands"]["props"]["figure"] = _plain(app.show_shortage_bands(1, selection))
+    components["shortage-bands"]["props"]["style"] = {**components["shortage-bands"]["props"]["style"],
+                                                      "display": "block"}
+    components["run-shortage-bands"]["props"]["style"] = {"display": "none"}
+    return layout
+
+
+def _callback_ids(dependency):
+    outputs = dependency["output"].strip(".").split("...")
+    ids = [output.rsplit(".", 1)[0] for output in outputs]
+    return ids + [item["id"] for item in dependency["inputs"] + dependency["state"]]
+
+
+def clientside_dependencies(dependencies, layout):
+    """The callbacks that run in the browser and only involve components on the page."""
+    ids = {node["props"]["id"] for node in _components(layout) if "id" in node["props"]}
+    return [dependency for dependency in dependencies if dependency.get("clientside_function")
+            and all(not isinstance(id_, str) or id_ in ids for id_ in _callback_ids(dependency))]
+
+
+def _package_file(url_path):
+    """Source file and directory of a /_dash-component-suites/<package>/<fingerprinted path> URL."""
+    from dash.fingerprint import check_fingerprint
+
+    package, path = url_path[len("/_dash-component-suites/"):].split("/", 1)
+    path, _ = check_fingerprint(path)
+    source = os.path.join(os.path.dirname(sys.modules[package].__file__), path)
+    return source, os.path.dirname(source)
+
+
+def _async_chunks(directory):
+    # Chunks a bundle loads on demand from its own folder (e.g. dcc's async-plotlyjs.js)
+    return sorted(name for name in os.listdir(directory) if name.startswith("async-") and name.endswith(".js"))
+
+
+class Bundle:
+    """Files written to the export folder, by path relative to it."""
+
+    def __init__(self, out_dir, base_url):
+        self.out_dir = out_dir
+        self.base_url = base_url.rstrip("/") + "/"
+        self.files = {}
+
+    def write(self, path, payload):
+        if path not in self.files:
+            full_path = os.path.join(self.out_dir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "wb") as f:
+                f.write(payload)
+            if path.endswith(compressible_extensions):
+                write_compressed(full_path, payload)
+            self.files[path] = len(payload)
+        return self.base_url + path
+
+    def write_hashed(self, file_name, payload):
+        stem, ext = os.path.splitext(file_name)
+        return self.write(f"static/{stem}.{_digest(payload)}{ext}", payload)
+
+
+def export_resources(index_html, client, bundle):
+    """Copy the scripts, stylesheets and icon the index page references; returns their URLs in the bundle."""
+    urls = {match["url"] for match in _local_url.finditer(index_html)}
+    exported = {}
+
+    # Bundles that load chunks at run time go into one content-hashed folder per source folder, chunks included;
+    # outside /_dash-component-suites/ the bundles request them without Dash's version fingerprint
+    groups = defaultdict(list)
+    for url in sorted(urls):
+        path = file_name = urlsplit(url).path
+        if path.startswith("/_dash-component-suites/"):
+            file_name, directory = _package_file(path)
+            if _async_chunks(directory):
+                groups[directory].append((url, file_name))
+                continue
+        payload = client.get(url).get_data()
+        exported[url] = bundle.write_hashed(os.path.basename(file_name), payload)
+
+    for directory, members in groups.items():
+        files = {os.path.basename(source): source for _, source in members}
+        files.update({name: os.path.join(directory, name) for name in _async_chunks(directory)})
+        payloads = {}
+        for name, source in sorted(files.items()):
+            with open(source, "rb") as f:
+                payloads[name] = f.read()
+        folder = f"static/{os.path.basename(directory)}.{_digest(b''.join(payloads.values()))}"
+        for name, payload in payloads.items():
+            bundle.write(f"{folder}/{name}", payload)
+        for url, source in members:
+            exported[url] = f"{bundle.base_url}{folder}/{os.path.basename(source)}"
+    return exported
+
+
+def page_html(index_html, resources, prefix):
+    """The index page with bundle URLs, its page data prefix and the script loading its page data."""
+    html = _local_url.sub(lambda match: f'{match["attr"]}="{resources[match["url"]]}"', index_html)
+
+    def set_prefix(match):
+        config = json.loads(match[2])
+        config.update(url_base_pathname=None, requests_pathname_prefix=prefix)
+        return (match[1] + json.dumps(config).replace("/", "\\u002f") + match[3]
+                + _page_data_script % json.dumps(page_files))
+
+    return _dash_config.sub(set_prefix, html)
+
+
+def combinations():
+    import data_store
+
+    return list(data_store.catalog().index)
+
+
+def export(out_dir="site", base_url="/", selected=None):
+    import app
+    import data_store
+
+    # Only a previous export is cleared, never an unrelated folder
+    if os.path.isdir(out_dir) and os.listdir(out_dir):
+        if not os.path.isdir(os.path.join(out_dir, "static")):
+            raise SystemExit(f"{out_dir} is not empty and does not hold an earlier export")
+        shutil.rmtree(out_dir)
+    bundle = Bundle(out_dir, base_url)
+    client = app.server.test_client()
+    index_html = client.get("/").get_data(as_text=True)
+    dependencies = client.get("/_dash-dependencies").get_json()
+    resources = export_resources(index_html, client, bundle)
+
+    default = (data_store.default_selection["region"], data_store.default_selection["soc"])
+    for region, soc in selected or combinations():
+        layout = static_layout(region, soc)
+        payloads = [json.dumps(data, separators=(",", ":")).encode("utf-8")
+                    for data in (layout, clientside_dependencies(dependencies, layout))]
+        folder = f"data/{_digest(b''.join(payloads))}"
+        for name, payload in zip(page_files.values(), payloads):
+            bundle.write(f"{folder}/{name}", payload)
+        html = page_html(index_html, resources, f"{bundle.base_url}{folder}/").encode("utf-8")
+        bundle.write(f"{data_store.page_path(region, soc).strip('/')}/index.html", html)
+        if (region, soc) == default:
+            bundle.write("index.html", html)
+        print(f"{region}/{soc}: {len(payloads[0]):,} bytes of page data")
+
+    print(f"{len(bundle.files)} files, {sum(bundle.files.values()):,} bytes in {out_dir}")
+    return bundle.files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the dashboards as a static site")
+    parser.add_argument("combinations", nargs="*", help="region/soc pairs to export (default: the whole catalog)")
+    parser.add_argument("--out-dir", default="site")
+    parser.add_argument("--base-url", default="/", help="URL path the site will be served from")
+    args = parser.parse_args()
+    export(args.out_dir, args.base_url, [tuple(pair.split("/")) for pair in args.combinations] or None)
@@ -0,0 +1,207 @@
+# Figure store: loads chart figures as Plotly JSON so the dashboard renders them with dcc.Graph
+#
+# numpy and plotly are imported on first use, keeping them out of worker start-up.
+import base64
+import json
+import os
+import re
+from functools import lru_cache
+
+# Compact payloads written by build_assets.py, listed in compiled/manifest.json
+compiled_dir = "compiled"
+
+# Figure JSON exports (figures/<name>.json)
+figures_dir = "figures"
+
+# Standalone HTML exports, used when a chart has no JSON export yet
+assets_dir = "assets"
+
+# Charts specific to one (region, SOC code) live under <region>/<soc>/ in any of the folders above; anything
+# missing there falls back to the shared chart of the same name
+figure_cache_size = 128
+
+# Charts the simulation engine can generate when no export is available, by charts.py function name
+generated_figures = {
+    "shortage_comparison": "shortage_comparison_figure",
+    "employment_comparison": "employment_comparison_figure",
+}
+
+# Matches the call a standalone Plotly HTML export uses to draw its figure
+_new_plot_call = re.compile(r'Plotly\.newPlot\(\s*"[^"]*",\s*')
+
+
+def figure_from_html(text):
+    """Extract the figure from a standalone Plotly HTML export."""
+    matches = list(_new_plot_call.finditer(text))
+    if not matches:
+        raise ValueError("no Plotly.newPlot call found")
+    decoder = json.JSONDecoder()
+    data, end = decoder.raw_decode(text, matches[-1].end())
+    end = text.index(",", end) + 1
+    while text[end].isspace():
+        end += 1
+    layout, _ = decoder.raw_decode(text, end)
+    return {"data": data, "layout": layout}
+
+
+def unpack_arrays(obj):
+    """Turn typed buffers ({"dtype", "bdata", "shape"}) back into NumPy arrays."""
+    if isinstance(obj, dict):
+        if "bdata" in obj and "dtype" in obj:
+            import numpy as np
+            arr = np.frombuffer(base64.b64decode(obj["bdata"]), dtype="<" + obj["dtype"])
+            return arr.reshape(obj["shape"]) if "shape" in obj else arr
+        return {key: unpack_arrays(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [unpack_arrays(value) for value in obj]
+    return obj
+
+
+def _stamp(path):
+    """Cache key that changes when a file is replaced, as in data_store."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=1)
+def _load_manifest(stamp):
+    if stamp is None:
+        return {}
+    with open(os.path.join(compiled_dir, "manifest.json")) as f:
+        return json.load(f)
+
+
+def load_manifest():
+    """The compiled manifest, read again whenever build_assets.py or pipeline.py rewrites it."""
+    return _load_manifest(_stamp(os.path.join(compiled_dir, "manifest.json")))
+
+
+@lru_cache(maxsize=1)
+def _revision(stamp):
+    import hashlib
+
+    charts = {name: entry for name, entry in load_manifest().items() if not name.startswith("layouts/")}
+    return hashlib.sha256(json.dumps(charts, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def data_revision():
+    """Short hash of the manifest's chart entries; changes whenever new chart payloads are compiled."""
+    return _revision(_stamp(os.path.join(compiled_dir, "manifest.json")))
+
+
+def placeholder_figure(message="Chart data unavailable"):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_annotation(text=message, showarrow=False, font={"size": 16})
+    fig.update_layout(xaxis={"visible": False}, yaxis={"visible": False}, template="plotly_white")
+    return fig
+
+
+@lru_cache(maxsize=figure_cache_size)
+def _load_compiled(file_name):
+    # Keyed by the content-hashed file, so combinations sharing a chart share one figure in memory
+    import plotly.graph_objects as go
+
+    with open(os.path.join(compiled_dir, file_name), encoding="utf-8") as f:
+        figure = json.load(f)
+    figure["data"] = [unpack_arrays(trace) for trace in figure["data"]]
+    return go.Figure(figure, skip_invalid=True)
+
+
+def load_layout_snapshot(region, soc):
+    """The manifest entry and serialized component tree of a prebuilt dashboard, or None."""
+    entry = load_manifest().get(f"layouts/{region}/{soc}")
+    if entry is None:
+        return None
+    with open(os.path.join(compiled_dir, entry["file"]), encoding="utf-8") as f:
+        return entry, json.load(f)
+
+
+def _existing_export(folder, name, extension):
+    """Path of a chart's export under folder, or None if there is none or the name would leave the folder."""
+    from werkzeug.security import safe_join
+
+    path = safe_join(folder, f"{name}{extension}")
+    return path if path is not None and os.path.exists(path) else None
+
+
+def chart_exists(name):
+    return (name in load_manifest()
+            or _existing_export(figures_dir, name, ".json") is not None
+            or _existing_export(assets_dir, name, ".html") is not None)
+
+
+def _folder_stamp(folder):
+    # Adding or removing a file changes the mtime of the directory holding it: the folder itself or a
+    # <region>/<soc>/ directory below it, so only directories are stat'ed, never the chart files
+    if not os.path.isdir(folder):
+        return None
+    regions = [entry.path for entry in os.scandir(folder) if entry.is_dir()]
+    socs = [entry.path for path in regions for entry in os.scandir(path) if entry.is_dir()]
+    return tuple((path, os.stat(path).st_mtime_ns) for path in [folder, *regions, *socs])
+
+
+def chart_names():
+    """Every chart the store can load (sorted tuple), combination-specific ones as "<region>/<soc>/<chart>"; the
+    folders are only walked again once the manifest or the set of exported files changes."""
+    return _chart_names(_stamp(os.path.join(compiled_dir, "manifest.json")), _folder_stamp(figures_dir),
+                        _folder_stamp(assets_dir))
+
+
+@lru_cache(maxsize=1)
+def _chart_names(manifest_stamp, figures_stamp, assets_stamp):
+    names = {name for name in load_manifest() if not name.startswith("layouts/")}
+    names.update(generated_figures)
+    for folder, extension in ((figures_dir, ".json"), (assets_dir, ".html")):
+        for current, _, files in os.walk(folder):
+            for file_name in files:
+                if file_name.endswith(extension):
+                    path = os.path.relpath(os.path.join(current, file_name), folder)
+                    names.add(path[:-len(extension)].replace(os.sep, "/"))
+    return tuple(sorted(names))
+
+
+def resolve_chart(name, region=None, soc=None):
+    """Store name of the combination's own version of a chart if it has one, else of the shared chart."""
+    if region and soc and chart_exists(f"{region}/{soc}/{name}"):
+        return f"{region}/{soc}/{name}"
+    return name
+
+
+def load_chart(name, region=None, soc=None):
+    """The combination's own version of a chart if it has one, else the shared chart."""
+    return load_figure(resolve_chart(name, region, soc))
+
+
+def load_figure(name):
+    """Load a chart by asset name (e.g. "scenario_forecasts"); figures are cached per process, compiled ones by
+    their content-hashed file, so a rewritten manifest is picked up by the next call."""
+    entry = load_manifest().get(name)
+    if entry is not None:
+        return _load_compiled(entry["file"])
+    return _load_export(name, tuple(_stamp(os.path.join(folder, f"{name}{extension}"))
+                                    for folder, extension in ((figures_dir, ".json"), (assets_dir, ".html"))))
+
+
+@lru_cache(maxsize=figure_cache_size)
+def _load_export(name, stamps):
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    json_path = _existing_export(figures_dir, name, ".json")
+    if json_path is not None:
+        return pio.read_json(json_path, skip_invalid=True)
+
+    html_path = _existing_export(assets_dir, name, ".html")
+    if html_path is not None:
+        with open(html_path, encoding="utf-8") as f:
+            return go.Figure(figure_from_html(f.read()), skip_invalid=True)
+
+    if name in generated_figures:
+        import charts
+        return getattr(charts, generated_figures[name])()
+
+    return placeholder_figure()
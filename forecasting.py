@@ -0,0 +1,208 @@
+# Demand forecasting service: SARIMAX/Prophet ensemble on monthly job-posting history with a fitted-model cache
+#
+# Fitted models are saved under cache/forecasts/, keyed by a hash of the training data and the hyperparameters.
+# When a series only gains new months, the previous fit is warm-started instead of refit from scratch: SARIMAX
+# keeps its parameters and only filters the new observations (results.append), Prophet restarts Stan from the
+# previous optimum. Scenario forecasts reuse one fit and only change the exogenous path.
+#
+# statsmodels and Prophet are optional; without Prophet the ensemble is SARIMAX only.
+import hashlib
+import json
+import os
+import pickle
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+try:
+    import statsmodels.api as sm
+except ImportError:  # forecasting is unavailable without statsmodels
+    sm = None
+
+try:
+    from prophet import Prophet
+    from prophet.serialize import model_from_json, model_to_json
+except ImportError:  # Prophet is optional
+    Prophet = None
+
+cache_dir = os.path.join("cache", "forecasts")
+
+default_sarimax_params = {"order": [1, 1, 1], "seasonal_order": [1, 0, 1, 12]}
+default_prophet_params = {"yearly_seasonality": True, "weekly_seasonality": False, "daily_seasonality": False}
+
+# Months of one-step-ahead errors used to weight the models, and how fast SARIMAX's weight hands over to
+# Prophet's along the horizon (short-term patterns vs long-term structure)
+weight_window = 12
+weight_decay_months = 24
+
+
+def data_hash(series, exog=None):
+    digest = hashlib.sha256()
+    digest.update(series.index.asi8.tobytes())
+    digest.update(np.ascontiguousarray(series.to_numpy(dtype=float)).tobytes())
+    if exog is not None:
+        digest.update(np.ascontiguousarray(exog.to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def params_hash(model, params):
+    return hashlib.sha256(json.dumps([model, params], sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _index_path():
+    return os.path.join(cache_dir, "index.json")
+
+
+def _load_index():
+    if not os.path.exists(_index_path()):
+        return {}
+    with open(_index_path()) as f:
+        return json.load(f)
+
+
+def _save_index(index):
+    with open(_index_path(), "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+
+@lru_cache(maxsize=32)
+def _load_fit(path):
+    if path.endswith(".json"):
+        with open(path) as f:
+            return model_from_json(f.read())
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _save_fit(path, fit):
+    # Prophet models go through Prophet's own JSON serializer, statsmodels results are pickled
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            f.write(model_to_json(fit))
+        return
+    with open(path, "wb") as f:
+        pickle.dump(fit, f)
+
+
+def _fit_sarimax(series, exog, params, previous=None):
+    if previous is not None:
+        new = series.iloc[len(previous.model.endog):]
+        new_exog = None if exog is None else exog.iloc[len(previous.model.endog):]
+        return previous.append(new, exog=new_exog, refit=False)
+    model = sm.tsa.SARIMAX(series, exog=exog, order=tuple(params["order"]),
+                           seasonal_order=tuple(params["seasonal_order"]),
+                           enforce_stationarity=False, enforce_invertibility=False)
+    return model.fit(disp=False)
+
+
+def _stan_init(model):
+    """Fitted Prophet parameters in the form Prophet.fit(init=...) expects."""
+    return {name: model.params[name][0][0] if name in ("k", "m", "sigma_obs") else model.params[name][0]
+            for name in ("k", "m", "sigma_obs", "delta", "beta")}
+
+
+def _fit_prophet(series, exog, params, previous=None):
+    model = Prophet(**params)
+    if exog is not None:
+        for column in exog.columns:
+            model.add_regressor(column)
+    frame = pd.DataFrame({"ds": series.index, "y": series.to_numpy()})
+    if exog is not None:
+        frame = pd.concat([frame, exog.reset_index(drop=True)], axis=1)
+    init = _stan_init(previous) if previous is not None else None
+    return model.fit(frame, init=init) if init else model.fit(frame)
+
+
+def fitted_model(model, series, exog=None, params=None, series_id="job_postings"):
+    """Load a cached fit for exactly this data and these hyperparameters, warm-start from a fit on an earlier
+    prefix of the same series, or fit from scratch; the result is cached on disk either way."""
+    params = params or (default_sarimax_params if model == "sarimax" else default_prophet_params)
+    os.makedirs(cache_dir, exist_ok=True)
+    key = params_hash(model, params)
+    extension = "pkl" if model == "sarimax" else "json"
+    file_name = f"{series_id}.{model}.{key}.{data_hash(series, exog)[:16]}.{extension}"
+    path = os.path.join(cache_dir, file_name)
+    if os.path.exists(path):
+        return _load_fit(path)
+
+    # Warm start when the latest cached fit was trained on a prefix of this series
+    index = _load_index()
+    latest = index.get(f"{series_id}.{model}.{key}")
+    previous = None
+    if latest and latest["length"] < len(series) and os.path.exists(os.path.join(cache_dir, latest["file"])):
+        prefix_exog = None if exog is None else exog.iloc[:latest["length"]]
+        if data_hash(series.iloc[:latest["length"]], prefix_exog) == latest["data_hash"]:
+            previous = _load_fit(os.path.join(cache_dir, latest["file"]))
+
+    fit = (_fit_sarimax if model == "sarimax" else _fit_prophet)(series, exog, params, previous)
+    _save_fit(path, fit)
+    index[f"{series_id}.{model}.{key}"] = {"file": file_name, "length": len(series),
+                                            "data_hash": data_hash(series, exog)}
+    _save_index(index)
+    return fit
+
+
+def _sarimax_forecast(fit, horizon, future_exog):
+    return np.asarray(fit.forecast(steps=horizon, exog=future_exog))
+
+
+def _prophet_forecast(fit, series, horizon, future_exog):
+    future = pd.DataFrame({"ds": pd.date_range(series.index[-1], periods=horizon + 1, freq="MS")[1:]})
+    if future_exog is not None:
+        future = pd.concat([future, future_exog.reset_index(drop=True)], axis=1)
+    return fit.predict(future)["yhat"].to_numpy()
+
+
+def _recent_errors(series, sarimax_fit, prophet_fit, exog):
+    """Mean squared one-step-ahead errors of each model over the last weight_window months."""
+    recent = series.iloc[-weight_window:]
+    sarimax_pred = np.asarray(sarimax_fit.predict(start=len(series) - weight_window, end=len(series) - 1))
+    errors = {"sarimax": np.mean((recent.to_numpy() - sarimax_pred) ** 2)}
+    if prophet_fit is not None:
+        frame = pd.DataFrame({"ds": recent.index})
+        if exog is not None:
+            frame = pd.concat([frame, exog.iloc[-weight_window:].reset_index(drop=True)], axis=1)
+        errors["prophet"] = np.mean((recent.to_numpy() - prophet_fit.predict(frame)["yhat"].to_numpy()) ** 2)
+    return errors
+
+
+def horizon_weights(errors, horizon):
+    """SARIMAX weight per forecast month: inverse-error share at the start, decaying towards Prophet."""
+    if "prophet" not in errors:
+        return np.ones(horizon)
+    inverse = {name: 1 / max(error, 1e-9) for name, error in errors.items()}
+    start = inverse["sarimax"] / sum(inverse.values())
+    return start * np.exp(-np.arange(horizon) / weight_decay_months)
+
+
+def forecast(series, horizon=72, exog=None, future_exog=None, series_id="job_postings",
+             sarimax_params=None, prophet_params=None):
+    """Ensemble forecast of a monthly series (DatetimeIndex at month starts).
+
+    Returns a DataFrame indexed by month with sarimax, prophet (when available), sarimax_weight and ensemble.
+    """
+    if sm is None:
+        raise ImportError("forecasting requires statsmodels")
+    sarimax_fit = fitted_model("sarimax", series, exog, sarimax_params, series_id)
+    prophet_fit = fitted_model("prophet", series, exog, prophet_params, series_id) if Prophet else None
+
+    dates = pd.date_range(series.index[-1], periods=horizon + 1, freq="MS")[1:]
+    result = pd.DataFrame({"sarimax": _sarimax_forecast(sarimax_fit, horizon, future_exog)}, index=dates)
+    weights = horizon_weights(_recent_errors(series, sarimax_fit, prophet_fit, exog), horizon)
+    result["sarimax_weight"] = weights
+    if prophet_fit is not None:
+        result["prophet"] = _prophet_forecast(prophet_fit, series, horizon, future_exog)
+        result["ensemble"] = weights * result["sarimax"] + (1 - weights) * result["prophet"]
+    else:
+        result["ensemble"] = result["sarimax"]
+    return result
+
+
+def scenario_forecasts(series, exog, scenarios, horizon=72, series_id="job_postings", **params):
+    """Ensemble forecasts for several future exogenous paths (e.g. unemployment scenarios) from one set of fits.
+
+    scenarios maps a scenario name to a DataFrame of future exog values with horizon rows.
+    """
+    return {name: forecast(series, horizon, exog, future_exog, series_id, **params)
+            for name, future_exog in scenarios.items()}
@@ -0,0 +1,50 @@
+# Production server profile, loaded by the Procfile (gunicorn --config gunicorn.conf.py app:server)
+#
+# Threaded workers keep slow callbacks (Monte Carlo bands, what-if runs) from blocking the many small asset and
+# layout requests of each page visit. The app is imported once before forking (preload_app), and when_ready then
+# builds the default dashboard and loads its figures in the master, so every worker, including the ones recycled
+# later, starts with them in its caches (shared copy-on-write until touched) instead of rebuilding them after fork.
+# Other combinations are still built lazily in each worker.
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+preload_app = True
+
+# Workers save their metrics in this folder so /metrics on any worker reports the whole server (instrumentation.py);
+# a fresh folder per start, set before the app is imported
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="dashboard-metrics-"))
+
+# Keep idle browser connections open between the asset fetches of a visit
+keepalive = 5
+
+# Long enough for a cold Monte Carlo run; a stuck worker is replaced after this
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# Recycle workers gradually (bounded memory growth from per-combination caches), finishing in-flight requests
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+graceful_timeout = 30
+
+accesslog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported and before the first worker is forked
+    import app
+    import data_store
+
+    app.warm_caches(data_store.default_selection["region"], data_store.default_selection["soc"])
+
+
+def worker_exit(server, worker):
+    # Recycled workers save their last second of metrics, which the flusher has not written yet
+    import instrumentation
+
+    if instrumentation.metrics_dir:
+        instrumentation.save_metrics()
@@ -0,0 +1,340 @@
+# Request instrumentation: latency and size histograms, in-flight gauges and cache counters, served at /metrics in
+# the Prometheus text format
+#
+# With METRICS_DIR set (gunicorn.conf.py sets it to a fresh folder per server start), every process saves its
+# metrics there about once a second and /metrics adds up all of them, so whichever worker a scrape reaches reports
+# the whole server, and counts survive worker restarts: files of exited workers are folded into retired.json. Without
+# it (the development server) metrics are per process and labelled with the pid. Requests are labelled
+# by URL rule, except files served by the asset, compiled and component-suite rules, which are labelled by path so
+# each chart bundle and asset shows up on its own; Dash callbacks are labelled by callback id.
+#
+# PROFILE_SAMPLING=1 starts a sampling profiler that records the stacks of request threads every PROFILE_INTERVAL_MS
+# (default 10); /debug/profile returns them in collapsed-stack format for flame graph tools.
+import atexit
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, g, request
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+size_buckets = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+profile_sampling = os.environ.get("PROFILE_SAMPLING", "0") == "1"
+profile_interval = int(os.environ.get("PROFILE_INTERVAL_MS", 10)) / 1000
+profile_max_depth = 40
+
+metrics_dir = os.environ.get("METRICS_DIR")
+flush_interval = 1.0
+
+# URL rules serving files, labelled by the file's path rather than the rule
+file_rules = ("/assets/<path:", "/compiled/<path:", "/_dash-component-suites/")
+
+_lock = threading.Lock()
+_save_lock = threading.Lock()  # the flusher and exit hooks write the same file
+_histograms = {}  # (metric, labels) -> [bucket counts..., sum, count]
+_counters = Counter()  # (metric, labels) -> value
+_in_flight = Counter()  # URL rule -> requests being handled
+_caches = {}  # name -> lru_cache-wrapped function or its "module.function" name
+_samples = Counter()  # collapsed stack -> samples
+_request_threads = set()
+_profiler_pid = None
+_flusher_pid = None
+_dash_app = None
+
+
+def watch_cache(name, func):
+    """Report hits and misses of an lru_cache-wrapped function, given directly or as "module.function" (reported
+    once something else has imported the module, so /metrics never triggers a heavy import)."""
+    _caches[name] = func
+
+
+def _cache_function(func):
+    if not isinstance(func, str):
+        return func
+    module, name = func.rsplit(".", 1)
+    return getattr(sys.modules[module], name) if module in sys.modules else None
+
+
+def _observe(metric, labels, value, buckets):
+    key = (metric, labels)
+    with _lock:
+        counts = _histograms.get(key)
+        if counts is None:
+            counts = _histograms[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+
+def _route(response):
+    """Label for a finished request: the URL rule, or the path itself for a file one of file_rules served."""
+    rule = _rule()
+    served = request.method == "GET" and response.status_code < 400
+    return request.path if served and rule.startswith(file_rules) else rule
+
+
+def _rule():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _start_profiler():
+    # Started from the first request of each process: threads started before gunicorn forks don't survive the fork
+    global _profiler_pid
+    with _lock:
+        if _profiler_pid == os.getpid():
+            return
+        _profiler_pid = os.getpid()
+    threading.Thread(target=_sample_stacks, name="sampling-profiler", daemon=True).start()
+
+
+def _snapshot():
+    """This process's metrics as plain JSON data."""
+    with _lock:
+        histograms = [[metric, labels, list(counts)] for (metric, labels), counts in _histograms.items()]
+        counters = [[metric, labels, value] for (metric, labels), value in _counters.items()]
+        in_flight = dict(_in_flight)
+    caches = {}
+    for name, func in _caches.items():
+        func = _cache_function(func)
+        if func is not None:
+            info = func.cache_info()
+            caches[name] = [info.hits, info.misses, info.currsize]
+    return {"histograms": histograms, "counters": counters, "in_flight": in_flight, "caches": caches}
+
+
+def save_metrics():
+    """Write this process's metrics to metrics_dir (the flusher does so about once a second)."""
+    path = os.path.join(metrics_dir, f"{os.getpid()}.json")
+    with _save_lock:
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(_snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+
+def _flush_metrics():
+    while True:
+        time.sleep(flush_interval)
+        save_metrics()
+
+
+def _start_flusher():
+    # Per process, like the profiler: the thread has to start after gunicorn forks the worker
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    atexit.register(save_metrics)
+    threading.Thread(target=_flush_metrics, name="metrics-flusher", daemon=True).start()
+
+
+def _before_request():
+    if profile_sampling:
+        _start_profiler()
+    if metrics_dir:
+        _start_flusher()
+    g.instrument_start = time.perf_counter()
+    g.instrument_rule = _rule()
+    if request.path.endswith("/_dash-update-component"):
+        # Only outputs of registered callbacks become labels; anything else a client sends is "unknown"
+        body = request.get_json(silent=True) or {}
+        output = body.get("output") if isinstance(body, dict) else None
+        g.instrument_callback = output if isinstance(output, str) and output in _dash_app.callback_map else "unknown"
+    with _lock:
+        _in_flight[g.instrument_rule] += 1
+        _request_threads.add(threading.get_ident())
+
+
+def _after_request(response):
+    if "instrument_start" not in g:
+        return response
+    elapsed = time.perf_counter() - g.instrument_start
+    # Only files that exist get a label of their own (missing ones are 404s); every other URL, including the pages
+    # Dash's catch-all /<path:path> answers for any path, is labelled by its rule so scans and typos add no series
+    route = _route(response)
+    labels = (("route", route), ("method", request.method), ("status", str(response.status_code)))
+    _observe("http_request_duration_seconds", labels, elapsed, latency_buckets)
+    if response.content_length is not None:  # streamed responses have no length
+        _observe("http_response_size_bytes", labels[:1], response.content_length, size_buckets)
+    # Conditional requests answered 304 are client cache hits; full responses to them are misses
+    if "If-None-Match" in request.headers or "If-Modified-Since" in request.headers:
+        outcome = "hit" if response.status_code == 304 else "miss"
+        with _lock:
+            _counters[("http_conditional_requests_total", (("route", route), ("result", outcome)))] += 1
+    if "instrument_callback" in g:
+        _observe("dash_callback_duration_seconds", (("callback", g.instrument_callback),), elapsed, latency_buckets)
+    return response
+
+
+def _teardown_request(exc):
+    if "instrument_rule" not in g:
+        return
+    with _lock:
+        _in_flight[g.instrument_rule] -= 1
+        _request_threads.discard(threading.get_ident())
+
+
+def _format_labels(labels):
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped))
+
+
+def _add(totals, snapshot, live):
+    """Add one process's snapshot to totals; gauges (in-flight requests, cache entries) only of live processes."""
+    for metric, labels, counts in snapshot["histograms"]:
+        key = (metric, tuple(map(tuple, labels)))
+        current = totals["histograms"].setdefault(key, [0] * len(counts))
+        totals["histograms"][key] = [a + b for a, b in zip(current, counts)]
+    for metric, labels, value in snapshot["counters"]:
+        totals["counters"][(metric, tuple(map(tuple, labels)))] += value
+    for name, (hits, misses, entries) in snapshot["caches"].items():
+        current = totals["caches"].setdefault(name, [0, 0, 0])
+        totals["caches"][name] = [current[0] + hits, current[1] + misses, current[2] + (entries if live else 0)]
+    if live:
+        totals["in_flight"].update(snapshot["in_flight"])
+
+
+def _empty():
+    return {"histograms": {}, "counters": Counter(), "in_flight": Counter(), "caches": {}}
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):  # removed or being replaced by its process
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _collect():
+    """Totals over every process sharing metrics_dir; exited workers' files are folded into retired.json."""
+    save_metrics()
+    totals = _empty()
+    with open(os.path.join(metrics_dir, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = os.path.join(metrics_dir, "retired.json")
+        retired = _read(retired_path)
+        exited = []
+        for name in os.listdir(metrics_dir):
+            if name.endswith(".json") and name.removesuffix(".json").isdigit():
+                snapshot = _read(os.path.join(metrics_dir, name))
+                if snapshot is None:
+                    continue
+                if _alive(int(name.removesuffix(".json"))):
+                    _add(totals, snapshot, live=True)
+                else:
+                    exited.append((name, snapshot))
+        if exited:
+            merged = _empty()
+            for snapshot in ([retired] if retired else []) + [snapshot for _, snapshot in exited]:
+                _add(merged, snapshot, live=False)
+            retired = {"histograms": [[*key, counts] for key, counts in merged["histograms"].items()],
+                       "counters": [[*key, value] for key, value in merged["counters"].items()],
+                       "in_flight": {}, "caches": merged["caches"]}
+            with open(f"{retired_path}.tmp", "w") as f:
+                json.dump(retired, f)
+            os.replace(f"{retired_path}.tmp", retired_path)
+            for name, _ in exited:
+                os.remove(os.path.join(metrics_dir, name))
+        if retired:
+            _add(totals, retired, live=False)
+    return totals
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    if metrics_dir:
+        totals, pid = _collect(), ()
+    else:
+        totals, pid = _empty(), (("pid", str(os.getpid())),)
+        _add(totals, _snapshot(), live=True)
+    histograms, counters, in_flight = totals["histograms"], totals["counters"], totals["in_flight"]
+    lines = []
+
+    typed = set()
+    for (metric, labels), counts in sorted(histograms.items()):
+        buckets = size_buckets if metric.endswith("_bytes") else latency_buckets
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        for bound, count in zip(buckets, counts):
+            lines.append(f"{metric}_bucket{{{_format_labels(pid + labels + (('le', str(bound)),))}}} {count}")
+        lines.append(f"{metric}_bucket{{{_format_labels(pid + labels + (('le', '+Inf'),))}}} {counts[-1]}")
+        lines.append(f"{metric}_sum{{{_format_labels(pid + labels)}}} {counts[-2]}")
+        lines.append(f"{metric}_count{{{_format_labels(pid + labels)}}} {counts[-1]}")
+
+    for (metric, labels), value in sorted(counters.items()):
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{{{_format_labels(pid + labels)}}} {value}")
+
+    lines.append("# TYPE http_requests_in_flight gauge")
+    for route, value in sorted(in_flight.items()):
+        lines.append(f"http_requests_in_flight{{{_format_labels(pid + (('route', route),))}}} {value}")
+
+    # Each family is written as one block under its TYPE line, so cache samples are collected before writing
+    cache_requests, cache_entries = [], []
+    for name, (hits, misses, entries) in sorted(totals["caches"].items()):
+        for result, value in (("hit", hits), ("miss", misses)):
+            cache_requests.append(
+                f"app_cache_requests_total{{{_format_labels(pid + (('cache', name), ('result', result)))}}} {value}")
+        cache_entries.append(f"app_cache_entries{{{_format_labels(pid + (('cache', name),))}}} {entries}")
+    lines += ["# TYPE app_cache_requests_total counter", *cache_requests]
+    lines += ["# TYPE app_cache_entries gauge", *cache_entries]
+    return "\n".join(lines) + "\n"
+
+
+def _sample_stacks():
+    """Profiler loop: count the current stack of every thread that is handling a request."""
+    while True:
+        time.sleep(profile_interval)
+        with _lock:
+            threads = set(_request_threads)
+        for ident, frame in sys._current_frames().items():
+            if ident not in threads:
+                continue
+            stack = []
+            while frame is not None and len(stack) < profile_max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            _samples[";".join(reversed(stack))] += 1
+
+
+def register_instrumentation(app):
+    """Install the request hooks and the /metrics (and, when profiling, /debug/profile) endpoints."""
+    global _dash_app
+    _dash_app = app
+    server = app.server
+    server.before_request(_before_request)
+    server.after_request(_after_request)
+    server.teardown_request(_teardown_request)
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    if profile_sampling:
+        @server.route("/debug/profile")
+        def profile():
+            samples = dict(_samples)
+            return Response("".join(f"{stack} {count}\n" for stack, count in
+                                    sorted(samples.items(), key=lambda item: -item[1])), mimetype="text/plain")
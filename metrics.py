@@ -0,0 +1,145 @@
+# Key metrics engine: computes the dashboard KPIs from the dual-pool model output
+#
+# The model output is one row per month (and per region when several are modelled) with columns:
+#   date, employment, projected_employment, openings, graduates, mobility_inflows, shortage
+# and optionally region and matching_efficiency. Parquet and CSV are both accepted.
+#
+# numpy and pandas are imported where they are used: when data/key_metrics.json (written by pipeline.py) matches the
+# model output, the KPIs are read from it and starting the dashboard never loads them.
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+# Where the model output is dropped on refresh
+data_dir = "data"
+model_output_names = ("model_output.parquet", "model_output.csv")
+
+# KPIs precomputed by pipeline.py, with the hash of the model output they were computed from
+key_metrics_path = os.path.join(data_dir, "key_metrics.json")
+
+# Used when the model output has no matching_efficiency column
+default_matching_efficiency = 0.7
+
+required_columns = ["date", "employment", "projected_employment", "openings", "graduates", "mobility_inflows",
+                    "shortage"]
+
+
+def find_model_output(directory=data_dir):
+    for name in model_output_names:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=64)
+def _file_hash(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    """SHA-256 of a file, only re-read when its modification time or size changes (callbacks ask on every run)."""
+    stat = os.stat(path)
+    return _file_hash(path, stat.st_mtime_ns, stat.st_size)
+
+
+def load_model_output(path):
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path, parse_dates=["date"])
+    missing = set(required_columns) - set(frame.columns)
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(sorted(missing))}")
+    return frame
+
+
+def compute_key_metrics(frame, by=()):
+    """KPIs per group in one vectorized pass; by=() treats the whole frame as one region."""
+    import numpy as np
+    import pandas as pd
+
+    keys = list(by)
+    frame = frame.sort_values(keys + ["date"])
+    if "matching_efficiency" not in frame:
+        frame = frame.assign(matching_efficiency=default_matching_efficiency)
+    if not keys:
+        frame = frame.assign(_all=0)
+        keys = ["_all"]
+
+    totals = frame.groupby(keys, sort=True).agg(
+        initial_workforce=("projected_employment", "first"),
+        final_workforce=("projected_employment", "last"),
+        final_employment=("employment", "last"),
+        avg_monthly_shortage=("shortage", "mean"),
+        total_cumulative_shortage=("shortage", "sum"),
+        graduates=("graduates", "sum"),
+        mobility_inflows=("mobility_inflows", "sum"),
+        matching_efficiency=("matching_efficiency", "mean"),
+    )
+
+    # Extra candidates needed to cover the cumulative shortage, given that only a matching_efficiency
+    # share of candidates is hired, expressed as a multiple of the current inflow
+    needed = totals["total_cumulative_shortage"] / totals["matching_efficiency"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        training_multiplier = 1 + needed / totals["graduates"]
+        mobility_multiplier = 1 + needed / totals["mobility_inflows"]
+
+    kpis = pd.DataFrame({
+        "initial_workforce": totals["initial_workforce"].round().astype(int),
+        "final_workforce": totals["final_workforce"].round().astype(int),
+        "projected_shortage_2030": (totals["final_workforce"] - totals["final_employment"]).clip(lower=0).round().astype(int),
+        "avg_monthly_shortage": totals["avg_monthly_shortage"].round().astype(int),
+        "total_cumulative_shortage": totals["total_cumulative_shortage"].round().astype(int),
+        "training_multiplier_needed": training_multiplier.round(2),
+        "mobility_multiplier_needed": mobility_multiplier.round(2),
+    })
+    return kpis.iloc[0] if keys == ["_all"] else kpis
+
+
+def kpi_dict(kpis):
+    """One region's KPIs as plain Python numbers."""
+    return {key: float(value) if key.endswith("_needed") else int(value) for key, value in kpis.items()}
+
+
+def read_key_metrics(path=None):
+    """KPIs for a single-region model output as a dict, memoized on the file's content hash (itself memoized on the
+    file's modification time and size, so repeated calls do not re-read the file).
+
+    Returns an empty dict when no model output has been dropped in yet.
+    """
+    path = path or find_model_output()
+    if path is None:
+        return {}
+    return dict(_key_metrics(path, file_hash(path)))
+
+
+@lru_cache(maxsize=4)
+def _key_metrics(path, digest):
+    # Bounded: a long-running worker sees a new digest with every data drop
+    precomputed = _precomputed_key_metrics()
+    if precomputed.get("source_sha256") == digest:
+        return precomputed["key_metrics"]
+    return kpi_dict(compute_key_metrics(load_model_output(path)))
+
+
+def _precomputed_key_metrics():
+    if not os.path.exists(key_metrics_path):
+        return {}
+    with open(key_metrics_path) as f:
+        return json.load(f)
+
+
+def write_key_metrics(path=None, out_path=key_metrics_path):
+    """Save the KPIs of a model output with its hash, so read_key_metrics can skip recomputing them."""
+    path = path or find_model_output()
+    precomputed = {"source_sha256": file_hash(path), "key_metrics": read_key_metrics(path)}
+    with open(out_path, "w") as f:
+        json.dump(precomputed, f, indent=2)
@@ -0,0 +1,187 @@
+# Occupational mobility: occupation-to-occupation transition rates as a sparse matrix, with monthly inflow pools and
+# transfer outflows for every occupation at once
+#
+#   python mobility.py build                    # matrix from data/inputs/onet_similar_occupations.csv
+#   python mobility.py flows [--soc 49-9041 ...]
+#
+# rates[i, j] is the monthly share of occupation j's workers who move into occupation i's candidate pool. It comes
+# from the O*NET similar-occupation lists: each occupation draws on its similar_per_occupation most similar
+# occupations, at the pair's rate when the file has one, else at the simulation's default mobility rate. Inflows
+# are rates @ employment and transfer outflows are the column sums of rates times employment, one sparse
+# matrix-vector product per month (or a single sparse x dense product over the months).
+#
+# The CSR arrays are saved as .npy files under data/mobility/ and loaded memory-mapped, so every worker process
+# reads the same pages instead of holding its own copy. Each build goes into a new versioned folder and matrix.json,
+# replaced last, switches to it; files other processes have mapped are never rewritten in place.
+import argparse
+import json
+import os
+import shutil
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from cohorts import soc_codes
+from metrics import data_dir, file_hash
+from simulation import default_params
+
+mobility_dir = os.path.join(data_dir, "mobility")
+similar_path = os.path.join(data_dir, "inputs", "onet_similar_occupations.csv")
+
+# Similar occupations a worker may come from, per occupation (O*NET lists them ranked)
+similar_per_occupation = 10
+
+# Monthly rate for pairs the file gives no rate for
+default_rate = default_params["mobility_rate"]
+
+# O*NET Related Occupations column names, and the plain soc, similar_soc[, rate] layout
+_onet_columns = ("O*NET-SOC Code", "Related O*NET-SOC Code", "Index")
+_csr_arrays = ("data", "indices", "indptr")
+
+
+def read_similar(path=similar_path):
+    """(occupations, similar occupations they draw on, monthly rates) as aligned arrays."""
+    columns = set(pd.read_csv(path, nrows=0).columns)
+    if set(_onet_columns) <= columns:
+        frame = pd.read_csv(path, usecols=list(_onet_columns), dtype=str)
+        frame.columns = ["soc", "similar_soc", "rank"]
+        frame["rank"] = pd.to_numeric(frame["rank"])
+        # O*NET-SOC codes carry a detail suffix ("49-9041.00"); flows are between SOC codes
+        for column in ("soc", "similar_soc"):
+            frame[column] = frame[column].str.split(".").str[0]
+        frame = frame[frame["rank"] <= similar_per_occupation]
+    else:
+        frame = pd.read_csv(path, dtype={"soc": str, "similar_soc": str})
+        frame = frame.groupby("soc", sort=False).head(similar_per_occupation)
+    rates = frame["rate"].to_numpy(dtype=float) if "rate" in frame else np.full(len(frame), default_rate)
+    return soc_codes(frame["soc"]), soc_codes(frame["similar_soc"]), rates
+
+
+def build_matrix(targets, sources, rates):
+    """(socs, rates matrix) over every occupation named on either side; repeated pairs are summed."""
+    keep = targets != sources
+    socs = np.unique(np.concatenate([targets, sources]))
+    rows, columns = np.searchsorted(socs, targets[keep]), np.searchsorted(socs, sources[keep])
+    matrix = sp.coo_matrix((rates[keep].astype(np.float32), (rows, columns)), shape=(socs.size, socs.size))
+    return socs, matrix.tocsr()
+
+
+def save_matrix(socs, matrix, source_sha256, directory=mobility_dir):
+    """Write the matrix into a new version folder, then point matrix.json at it and drop older versions."""
+    version = f"v{time.time_ns()}"
+    os.makedirs(os.path.join(directory, version))
+    matrix = matrix.tocsr()
+    matrix.sort_indices()
+    for name in _csr_arrays:
+        np.save(os.path.join(directory, version, f"{name}.npy"), getattr(matrix, name))
+    np.save(os.path.join(directory, version, "socs.npy"), socs)
+
+    meta_path = os.path.join(directory, "matrix.json")
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump({"source_sha256": source_sha256, "version": version, "occupations": int(socs.size),
+                   "pairs": int(matrix.nnz)}, f, indent=2)
+    os.replace(f"{meta_path}.tmp", meta_path)
+    # Processes still mapping an old version keep reading it: removing the files leaves their mapped pages intact
+    for name in os.listdir(directory):
+        if name.startswith("v") and name != version and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    _load_matrix.cache_clear()
+
+
+@lru_cache(maxsize=1)
+def _load_matrix(directory, stamp):
+    with open(os.path.join(directory, "matrix.json")) as f:
+        meta = json.load(f)
+    if "version" not in meta:
+        return None  # written before versioned folders; rebuilt by refresh_matrix
+    folder = os.path.join(directory, meta["version"])
+    arrays = [np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r") for name in _csr_arrays]
+    socs = np.load(os.path.join(folder, "socs.npy"))
+    # copy=False keeps the memory maps as the matrix's buffers
+    matrix = sp.csr_matrix(tuple(arrays), shape=(socs.size, socs.size), copy=False)
+    return socs, matrix, meta["source_sha256"]
+
+
+def load_matrix(directory=mobility_dir):
+    """(socs, rates matrix, source hash) from the memory-mapped cache, or None before the first build."""
+    meta_path = os.path.join(directory, "matrix.json")
+    if not os.path.exists(meta_path):
+        return None
+    return _load_matrix(directory, os.stat(meta_path).st_mtime_ns)
+
+
+def refresh_matrix(path=similar_path, directory=mobility_dir):
+    """The cached matrix, rebuilt only when the similar-occupation file has changed."""
+    cached = load_matrix(directory)
+    if cached is None or cached[2] != file_hash(path):
+        socs, matrix = build_matrix(*read_similar(path))
+        save_matrix(socs, matrix, file_hash(path), directory)
+        cached = load_matrix(directory)
+    return cached[0], cached[1]
+
+
+def outflow_rates(matrix):
+    """Monthly share of each occupation's workers transferring into the others."""
+    return np.asarray(matrix.sum(axis=0)).ravel()
+
+
+def monthly_flows(matrix, employment):
+    """Inflow pools and transfer outflows for employment by occupation: a vector, or (month x occupation) for
+    every month in one sparse x dense product."""
+    employment = np.asarray(employment, dtype=float)
+    if employment.ndim == 1:
+        return matrix @ employment, outflow_rates(matrix) * employment
+    return (matrix @ employment.T).T, outflow_rates(matrix)[None, :] * employment
+
+
+def align(socs, matrix_socs):
+    """Positions of socs in the matrix, and a mask of the ones it covers."""
+    positions = np.minimum(np.searchsorted(matrix_socs, socs), matrix_socs.size - 1)
+    return positions, matrix_socs[positions] == socs
+
+
+def occupation_flows(socs, matrix, employment, occupations):
+    """Monthly flows (month x occupation) for employment given over occupations, e.g. a cohorts projection.
+
+    Occupations missing from the matrix get no flows, and employment of occupations outside occupations counts as 0.
+    """
+    positions, covered = align(np.asarray(occupations), socs)
+    employment = np.atleast_2d(employment)
+    full = np.zeros((employment.shape[0], socs.size))
+    full[:, positions[covered]] = employment[:, covered]
+    inflows, outflows = monthly_flows(matrix, full)
+    result = np.zeros((2,) + employment.shape)
+    result[0][:, covered] = inflows[:, positions[covered]]
+    result[1][:, covered] = outflows[:, positions[covered]]
+    return {"inflows": result[0], "transfers_out": result[1]}
+
+
+def summary(flows, occupations, retirements=None):
+    """Per-occupation totals over the months, with transfers' share of separations when retirements are given."""
+    frame = pd.DataFrame({"inflows": flows["inflows"].sum(axis=0), "transfers_out": flows["transfers_out"].sum(axis=0)},
+                         index=pd.Index(occupations, name="soc"))
+    if retirements is not None:
+        frame["transfer_share"] = frame["transfers_out"] / (frame["transfers_out"] + retirements.sum(axis=0))
+    return frame.sort_values("inflows", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Occupational mobility flows")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="transition matrix from the O*NET similar-occupation lists")
+    flows_command = commands.add_parser("flows", help="inflows and transfers for a cohorts projection")
+    flows_command.add_argument("--soc", nargs="*", help="only these SOC codes")
+    args = parser.parse_args()
+
+    socs, matrix = refresh_matrix()
+    print(f"{socs.size:,} occupations, {matrix.nnz:,} transition pairs")
+    if args.command == "flows":
+        import cohorts
+
+        result = cohorts.statewide(cohorts.refresh_profiles(), cohorts.read_projections(), args.soc,
+                                   keep_ages=False)
+        flows = occupation_flows(socs, matrix, result["employment"], result["socs"])
+        print(summary(flows, result["socs"], result["retirements"]).head(15).round(3).to_string())
@@ -0,0 +1,92 @@
+# Monte Carlo uncertainty bands for the dual-pool simulation
+#
+#   python monte_carlo.py [--paths 20000] [--batch-size 1000] [--workers 4] [--seed 2025]
+#
+# Uncertain parameters are sampled once per path, paths are simulated in vectorized batches (optionally spread over
+# a process pool), and every batch draws from its own child of one SeedSequence, so a given seed reproduces the same
+# bands whatever the worker count.
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation import default_params, simulate
+
+# Relative spread of the uncertain parameters around their default (or overridden) value: the retirement hazard
+# from the IPUMS age distribution, transfer rates tied to unemployment and wage gaps, and matching efficiency
+parameter_spread = {
+    "retirement_scale": 0.15,
+    "transfer_rate": 0.2,
+    "mobility_rate": 0.25,
+    "monthly_graduates": 0.1,
+    "matching_efficiency": 0.07,
+}
+
+default_percentiles = (10, 50, 90)
+
+
+def sample_params(rng, n, **overrides):
+    """Draw n parameter sets; spreads are lognormal so rates stay positive."""
+    params = {**default_params, **overrides}
+    sampled = {name: params[name] * rng.lognormal(-spread ** 2 / 2, spread, n)
+               for name, spread in parameter_spread.items()}
+    sampled["matching_efficiency"] = np.clip(sampled["matching_efficiency"], 0.3, 0.95)
+    return {**overrides, **sampled}
+
+
+def run_batch(seed_sequence, n, overrides):
+    rng = np.random.default_rng(seed_sequence)
+    result = simulate(**sample_params(rng, n, **overrides))
+    return result["shortage"].astype(np.float32), result["employment"].astype(np.float32)
+
+
+def iter_bands(n_paths=5000, batch_size=1000, seed=2025, workers=1, percentiles=default_percentiles, **overrides):
+    """Yield (paths done, bands) after each batch, bands being percentile arrays of shortage and employment.
+
+    workers=1 runs batches in-process; more workers use a ProcessPoolExecutor.
+    """
+    sizes = [batch_size] * (n_paths // batch_size) + ([n_paths % batch_size] if n_paths % batch_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = (seeds, sizes, [overrides] * len(sizes))
+
+    shortage, employment = [], []
+    if workers == 1:
+        batches = map(run_batch, *args)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        batches = executor.map(run_batch, *args)
+    try:
+        for batch_shortage, batch_employment in batches:
+            shortage.append(batch_shortage)
+            employment.append(batch_employment)
+            all_shortage = np.concatenate(shortage)
+            yield all_shortage.shape[0], {
+                "percentiles": list(percentiles),
+                "shortage": np.percentile(all_shortage, percentiles, axis=0),
+                "employment": np.percentile(np.concatenate(employment), percentiles, axis=0),
+                "cumulative_shortage": np.percentile(all_shortage.sum(axis=1), percentiles),
+            }
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def monte_carlo_bands(**kwargs):
+    """Final bands of iter_bands."""
+    bands = None
+    for _, bands in iter_bands(**kwargs):
+        pass
+    return bands
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo shortage bands")
+    parser.add_argument("--paths", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--seed", type=int, default=2025)
+    args = parser.parse_args()
+    for done, bands in iter_bands(args.paths, args.batch_size, args.seed, args.workers):
+        print(f"{done:,} paths: cumulative shortage P10/P50/P90 = "
+              + " / ".join(f"{v:,.0f}" for v in bands["cumulative_shortage"]))
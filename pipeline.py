@@ -0,0 +1,182 @@
+# Incremental forecast refresh: rebuilds only the charts and metrics whose input datasets changed
+#
+#   python pipeline.py [--dry-run] [--force] [--workers N] [output ...]
+#
+# Every output lists the input datasets it is built from. The input hashes used for each output's last successful
+# build are kept in data/pipeline_state.json; on refresh an output is stale when one of its inputs hashes
+# differently (or its result is missing), and stale outputs are rebuilt in parallel on a process pool. Rebuilt
+# figures are written to figures/<name>.json and compiled into the asset manifest.
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import charts
+import skill_index
+from build_assets import compile_figure, snapshot_layouts, update_manifest
+from figure_store import compiled_dir, figures_dir
+from metrics import data_dir, file_hash, find_model_output, key_metrics_path, read_key_metrics, write_key_metrics
+
+state_path = os.path.join(data_dir, "pipeline_state.json")
+inputs_dir = os.path.join(data_dir, "inputs")
+
+# Upstream datasets, by name
+inputs = {
+    "job_postings": os.path.join(inputs_dir, "job_postings.csv"),
+    "bls_unemployment": os.path.join(inputs_dir, "bls_unemployment.csv"),
+    "nc_commerce_projections": os.path.join(inputs_dir, "nc_commerce_projections.csv"),
+    "nc_tower_enrollment": os.path.join(inputs_dir, "nc_tower_enrollment.csv"),
+    "ipums_age_distribution": os.path.join(inputs_dir, "ipums_age_distribution.csv"),
+    "onet_similar_occupations": os.path.join(inputs_dir, "onet_similar_occupations.csv"),
+    "posting_skills": os.path.join(inputs_dir, "posting_skills.csv"),
+    "model_output": find_model_output() or os.path.join(data_dir, "model_output.csv"),
+}
+
+# Outputs and the datasets they are built from; builder is a function name in this module, or None for charts
+# still produced outside the project (those are reported when stale so they can be re-exported)
+outputs = {
+    "key_metrics": {"inputs": ["model_output"], "builder": "build_key_metrics"},
+    "central_visualization": {"inputs": ["model_output", "job_postings"], "builder": None},
+    "scenario_forecasts": {"inputs": ["job_postings", "bls_unemployment"], "builder": None},
+    "model_forecasts": {"inputs": ["job_postings"], "builder": None},
+    "demand_breakdown": {"inputs": ["model_output"], "builder": None},
+    "demand_composition": {"inputs": ["model_output"], "builder": None},
+    "employment_comparison": {"inputs": ["model_output"], "builder": "build_figure"},
+    "shortage_comparison": {"inputs": ["model_output"], "builder": "build_figure"},
+    "workforce_composition": {"inputs": ["ipums_age_distribution", "onet_similar_occupations", "model_output"],
+                              "builder": None},
+    "enrollment_projections": {"inputs": ["nc_tower_enrollment"], "builder": None},
+    "historical_projected_graduates": {"inputs": ["nc_tower_enrollment"], "builder": None},
+    "completion_timing": {"inputs": ["nc_tower_enrollment"], "builder": None},
+    "monthly_graduates_stacked": {"inputs": ["nc_tower_enrollment"], "builder": None},
+    "job_clusters_tsne": {"inputs": ["posting_skills"], "builder": "build_job_clusters"},
+    "occupation_distribution": {"inputs": ["posting_skills"], "builder": None},
+    "skill_heatmap": {"inputs": ["posting_skills"], "builder": None},
+    "time_variant_parameters": {"inputs": ["ipums_age_distribution", "bls_unemployment", "nc_commerce_projections"],
+                                "builder": None},
+    "matching_efficiency": {"inputs": ["bls_unemployment", "nc_commerce_projections"], "builder": None},
+}
+
+
+def output_path(name):
+    if name == "key_metrics":
+        return key_metrics_path
+    return os.path.join(figures_dir, f"{name}.json")
+
+
+def build_key_metrics(name):
+    write_key_metrics(inputs["model_output"], output_path(name))
+
+
+def build_figure(name):
+    kpis = read_key_metrics(inputs["model_output"])
+    base = {key: kpis[key] for key in ("initial_workforce", "final_workforce") if key in kpis}
+    names, result = charts.run_scenarios({label: {**base, **overrides}
+                                          for label, overrides in charts.comparison_scenarios.items()})
+    fig = getattr(charts, f"{name}_figure")(names, result)
+    fig.write_json(output_path(name))
+
+
+def build_job_clusters(name):
+    # Folds only the postings appended since the last refresh into the saved skill index
+    charts.job_clusters_figure(skill_index.refresh_index(inputs["posting_skills"])).write_json(output_path(name))
+
+
+def run_builder(name):
+    os.makedirs(os.path.dirname(output_path(name)), exist_ok=True)
+    globals()[outputs[name]["builder"]](name)
+    return name
+
+
+def load_state():
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def input_hashes():
+    return {name: file_hash(path) if os.path.exists(path) else None for name, path in inputs.items()}
+
+
+def stale_outputs(hashes, state, selected=None, force=False):
+    stale = []
+    for name, spec in outputs.items():
+        if selected and name not in selected:
+            continue
+        current = {dataset: hashes[dataset] for dataset in spec["inputs"]}
+        if None in current.values():
+            continue  # an input has not been dropped in yet
+        if force or state.get(name) != current or spec["builder"] and not os.path.exists(output_path(name)):
+            stale.append(name)
+    return stale
+
+
+def refresh(selected=None, force=False, workers=None, dry_run=False):
+    """Rebuild stale outputs; returns (rebuilt, needs_export, failed) lists of output names."""
+    hashes = input_hashes()
+    state = load_state()
+    stale = stale_outputs(hashes, state, selected, force)
+    buildable = [name for name in stale if outputs[name]["builder"]]
+    needs_export = [name for name in stale if not outputs[name]["builder"]]
+    if dry_run or not buildable:
+        return buildable if dry_run else [], needs_export, []
+
+    rebuilt, failed = [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_builder, name): name for name in buildable}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+            except Exception as e:  # keep the old state so the output is retried next refresh
+                print(f"{name}: failed ({e})")
+                failed.append(name)
+                continue
+            state[name] = {dataset: hashes[dataset] for dataset in outputs[name]["inputs"]}
+            rebuilt.append(name)
+
+    figures = [name for name in rebuilt if output_path(name).startswith(figures_dir)]
+    if figures:
+        os.makedirs(compiled_dir, exist_ok=True)
+        update_manifest(dict(compile_figure(output_path(name), compiled_dir, name) for name in figures))
+    if rebuilt and os.path.exists(os.path.join(compiled_dir, "manifest.json")):
+        update_manifest(snapshot_layouts())  # dashboards embed the key metrics and some figures
+
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    return sorted(rebuilt), needs_export, failed
+
+
+def mark_exported(names):
+    """Record externally exported charts as up to date with the current inputs."""
+    hashes = input_hashes()
+    state = load_state()
+    for name in names:
+        state[name] = {dataset: hashes[dataset] for dataset in outputs[name]["inputs"]}
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the charts and metrics affected by changed inputs")
+    parser.add_argument("outputs", nargs="*", help="limit the refresh to these outputs")
+    parser.add_argument("--force", action="store_true", help="rebuild even if inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be rebuilt")
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--mark-exported", action="store_true",
+                        help="record the listed externally produced charts as up to date")
+    args = parser.parse_args()
+
+    unknown = set(args.outputs) - set(outputs)
+    if unknown:
+        parser.error(f"unknown outputs: {', '.join(sorted(unknown))}")
+    if args.mark_exported:
+        mark_exported(args.outputs)
+    else:
+        rebuilt, needs_export, failed = refresh(args.outputs, args.force, args.workers, args.dry_run)
+        print(("Would rebuild: " if args.dry_run else "Rebuilt: ") + (", ".join(rebuilt) or "nothing"))
+        if needs_export:
+            print("Stale, re-export from the modelling notebooks: " + ", ".join(needs_export))
+        if failed:
+            raise SystemExit(1)
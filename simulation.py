@@ -0,0 +1,126 @@
+# Dual-pool labor market simulation: employed workers by single year of age plus a pool of qualified candidates
+#
+# Every parameter may be a scalar or an array with one value per scenario; all scenarios are stepped together
+# as (scenario x age) arrays, so hundreds of parameter sets cost about the same as one.
+import itertools
+
+import numpy as np
+import pandas as pd
+
+start_month = "2025-01"
+horizon_months = 72  # 2025-2030
+
+# Single-year age cohorts
+ages = np.arange(18, 71)
+
+default_params = {
+    "initial_workforce": 4555.0,     # NC Commerce 2025 estimate
+    "final_workforce": 5071.0,       # NC Commerce 2030 projection, drives growth demand
+    "monthly_graduates": 8.5,        # NC Tower completions entering the candidate pool
+    "training_multiplier": 1.0,
+    "similar_workforce": 21000.0,    # workers in the 10 most similar O*NET occupations
+    "mobility_rate": 0.00026,        # monthly share of them entering the candidate pool
+    "mobility_multiplier": 1.0,
+    "transfer_rate": 0.0037,         # monthly share of employed workers transferring out
+    "matching_efficiency": 0.7,
+    "pool_attrition": 0.08,          # monthly share of candidates leaving the pool unhired
+    "retirement_scale": 1.0,         # multiplies the age-specific retirement hazard
+}
+
+
+def default_age_distribution():
+    """Mid-heavy age profile of the occupation (IPUMS, North Carolina)."""
+    weights = np.exp(-0.5 * ((ages - 46) / 11.0) ** 2)
+    return weights / weights.sum()
+
+
+def entrant_age_distribution():
+    """Age profile of new hires, concentrated in the twenties and thirties."""
+    weights = np.exp(-0.5 * ((ages - 29) / 7.0) ** 2)
+    return weights / weights.sum()
+
+
+def monthly_retirement_hazard():
+    """Monthly retirement probability by age, rising steeply from the late fifties."""
+    annual = 0.003 + 0.45 / (1 + np.exp(-(ages - 63) / 2.0))
+    return 1 - (1 - annual) ** (1 / 12)
+
+
+def scenario_params(**params):
+    """Merge params over the defaults and broadcast every value to one entry per scenario."""
+    merged = {**default_params, **params}
+    unknown = set(merged) - set(default_params)
+    if unknown:
+        raise ValueError(f"unknown simulation parameters: {', '.join(sorted(unknown))}")
+    arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in merged.values()))
+    return {name: np.array(a) for name, a in zip(merged, arrays)}
+
+
+def param_grid(**ranges):
+    """Cartesian product of parameter values, as per-scenario arrays for simulate()."""
+    names = list(ranges)
+    combos = np.array(list(itertools.product(*ranges.values())), dtype=float)
+    return {name: combos[:, i] for i, name in enumerate(names)}
+
+
+def simulate(months=horizon_months, age_distribution=None, keep_cohorts=False, **params):
+    """Step all scenarios forward month by month.
+
+    Returns a dict of (scenario x month) arrays: employment, target, openings, hires, shortage,
+    retirements, transfers_out, pool and mobility_inflows, plus employment_by_age
+    (scenario x month x age) when keep_cohorts is set.
+    """
+    p = scenario_params(**params)
+    n = p["initial_workforce"].shape[0]
+    age_distribution = default_age_distribution() if age_distribution is None else np.asarray(age_distribution)
+
+    hazard = monthly_retirement_hazard()[None, :] * p["retirement_scale"][:, None]
+    entrants = entrant_age_distribution()
+    target = p["initial_workforce"][:, None] + np.outer(
+        p["final_workforce"] - p["initial_workforce"], np.arange(1, months + 1) / months)
+    graduates = p["monthly_graduates"] * p["training_multiplier"]
+    mobility = p["similar_workforce"] * p["mobility_rate"] * p["mobility_multiplier"]
+
+    employed = p["initial_workforce"][:, None] * age_distribution[None, :]
+    pool = np.zeros(n)
+
+    out = {name: np.empty((n, months)) for name in (
+        "employment", "openings", "hires", "shortage", "retirements", "transfers_out", "pool", "mobility_inflows")}
+    out["target"] = target
+    if keep_cohorts:
+        out["employment_by_age"] = np.empty((n, months, ages.size))
+
+    for t in range(months):
+        retirements = employed * hazard
+        transfers = employed * p["transfer_rate"][:, None]
+        employed -= retirements + transfers
+        retired = retirements.sum(axis=1)
+
+        # Cohorts age a year every twelve months; the oldest cohort leaves the occupation and counts as retired,
+        # as in cohorts.project
+        if t % 12 == 11:
+            retired = retired + employed[:, -1]
+            employed[:, 1:] = employed[:, :-1].copy()
+            employed[:, 0] = 0
+
+        # Replacement demand for this month's separations plus growth demand along the projection
+        growth = target[:, t] - (target[:, t - 1] if t else p["initial_workforce"])
+        openings = np.maximum(retired + transfers.sum(axis=1) + growth, 0)
+        pool = pool * (1 - p["pool_attrition"]) + graduates + mobility
+        hires = np.minimum(openings, p["matching_efficiency"] * pool)
+        pool -= hires
+        employed += hires[:, None] * entrants[None, :]
+
+        out["employment"][:, t] = employed.sum(axis=1)
+        out["openings"][:, t] = openings
+        out["hires"][:, t] = hires
+        out["shortage"][:, t] = openings - hires
+        out["retirements"][:, t] = retired
+        out["transfers_out"][:, t] = transfers.sum(axis=1)
+        out["pool"][:, t] = pool
+        out["mobility_inflows"][:, t] = mobility
+        if keep_cohorts:
+            out["employment_by_age"][:, t] = employed
+
+    out["dates"] = pd.period_range(start_month, periods=months, freq="M").to_timestamp()
+    return out
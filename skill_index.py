@@ -0,0 +1,318 @@
+# Skill-similarity index over job titles: sparse title x skill matrix, LSH nearest neighbours, incremental clustering
+#
+#   python skill_index.py build                 # index data/inputs/posting_skills.csv from scratch
+#   python skill_index.py update                # fold in rows appended to the CSV since the last build/update
+#   python skill_index.py similar "CNC Machinist" [-k 10]
+#
+# Titles are rows of a sparse skill-count matrix (posting_skills.csv: title, skill[, count]), weighted 1 + log(count)
+# and L2-normalised so dot products are cosine similarities. Nearest neighbours come from random-hyperplane LSH:
+# candidates share a hash bucket in at least one table and are re-ranked exactly. Clusters are spherical mini-batch
+# k-means centroids that new titles update in place, and the 2-D layout places a new title at the similarity-weighted
+# position of its neighbours, so an update only touches the titles it adds or changes.
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import svds
+
+from metrics import data_dir
+
+index_dir = os.path.join(data_dir, "skill_index")
+postings_path = os.path.join(data_dir, "inputs", "posting_skills.csv")
+
+# Functional clusters of the Occupational Evolution section; set names with name_clusters once their top skills
+# have been reviewed (unnamed clusters are labelled by their top skills)
+n_clusters = 3
+
+# LSH tables x bits per table: more tables find more true neighbours, more bits make buckets smaller
+lsh_tables = 8
+lsh_bits = 12
+
+# Neighbours used to place a new title in the 2-D layout, and the mini-batch k-means passes (on a full build) and
+# batch size
+layout_neighbours = 10
+kmeans_passes = 5
+kmeans_batch_size = 1024
+seed = 2025
+
+
+def read_postings(path=postings_path, skip_rows=0):
+    """(title, skill, count) rows of the posting scrape, skipping rows already ingested."""
+    frame = pd.read_csv(path, skiprows=range(1, skip_rows + 1), dtype={"title": str, "skill": str})
+    if "count" not in frame:
+        frame["count"] = 1
+    return frame[["title", "skill", "count"]]
+
+
+def _weighted(counts):
+    """Sublinear, L2-normalised rows; rows do not depend on the rest of the corpus, so they never need reweighting."""
+    vectors = counts.astype(np.float32).tocsr(copy=True)
+    vectors.data = 1 + np.log(vectors.data)
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1))).ravel()
+    return sp.diags(1 / np.maximum(norms, 1e-12)).dot(vectors).tocsr()
+
+
+def _hash(index, vectors):
+    """LSH codes, one integer per table, of each row."""
+    bits = (vectors @ index["planes"]) > 0
+    weights = 1 << np.arange(lsh_bits, dtype=np.int64)
+    return bits.reshape(vectors.shape[0], lsh_tables, lsh_bits).astype(np.int64) @ weights
+
+
+def _build_buckets(index):
+    index["buckets"] = [{} for _ in range(lsh_tables)]
+    for row, codes in enumerate(index["codes"]):
+        for table, code in enumerate(codes):
+            index["buckets"][table].setdefault(int(code), []).append(row)
+
+
+def _grow_skills(index, skills):
+    """Add new skill columns; existing titles have no weight on them, so their hashes and clusters are unchanged."""
+    new = [skill for skill in dict.fromkeys(skills) if skill not in index["skill_ids"]]
+    if not new:
+        return
+    for skill in new:
+        index["skill_ids"][skill] = len(index["skills"])
+        index["skills"].append(skill)
+    rng = np.random.default_rng([seed, len(index["skills"])])
+    index["planes"] = np.vstack([index["planes"],
+                                 rng.standard_normal((len(new), lsh_tables * lsh_bits)).astype(np.float32)])
+    index["centroids"] = np.hstack([index["centroids"], np.zeros((n_clusters, len(new)), dtype=np.float32)])
+    index["counts"].resize((index["counts"].shape[0], len(index["skills"])))
+
+
+def _count_matrix(index, frame):
+    """Sparse counts of a posting frame, with rows in index title order (new titles appended)."""
+    frame = frame.dropna()
+    for title in dict.fromkeys(frame["title"]):
+        if title not in index["title_ids"]:
+            index["title_ids"][title] = len(index["titles"])
+            index["titles"].append(title)
+    rows = frame["title"].map(index["title_ids"]).to_numpy()
+    columns = frame["skill"].map(index["skill_ids"]).to_numpy()
+    return sp.csr_matrix((frame["count"].to_numpy(dtype=np.float32), (rows, columns)),
+                         shape=(len(index["titles"]), len(index["skills"])))
+
+
+def _assign(index, rows):
+    """Mini-batch spherical k-means step for the given rows: assign each to its nearest centroid and move each
+    centroid towards the mean of its batch members with a (members / titles in the cluster) learning rate.
+
+    cluster_sizes counts each title once, in the cluster it is assigned to (label -1: not assigned yet), so titles
+    re-assigned on a refresh or a later pass move between counts instead of adding to them.
+    """
+    for start in range(0, len(rows), kmeans_batch_size):
+        batch = np.asarray(rows[start:start + kmeans_batch_size])
+        vectors = index["vectors"][batch]
+        previous = index["labels"][batch]
+        labels = np.asarray(vectors @ index["centroids"].T).argmax(axis=1)
+        moved = (previous >= 0) & (previous != labels)
+        np.subtract.at(index["cluster_sizes"], previous[moved], 1)
+        for cluster in np.unique(labels):
+            members = labels == cluster
+            index["cluster_sizes"][cluster] += (members & (previous != cluster)).sum()
+            step = min(members.sum() / index["cluster_sizes"][cluster], 1.0)
+            mean = np.asarray(vectors[members].mean(axis=0)).ravel()
+            centroid = (1 - step) * index["centroids"][cluster] + step * mean
+            index["centroids"][cluster] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        index["labels"][batch] = labels
+
+
+def _place(index, rows):
+    """Fold new titles into the 2-D layout at the similarity-weighted position of their placed neighbours."""
+    placed = np.isfinite(index["embedding"][:, 0])
+    for row in rows:
+        neighbours = [(other, score) for other, score in _query(index, index["vectors"][row], layout_neighbours + 1)
+                      if other != row and placed[other] and score > 0]
+        if neighbours:
+            others, scores = map(np.array, zip(*neighbours))
+            index["embedding"][row] = scores @ index["embedding"][others] / scores.sum()
+        else:
+            index["embedding"][row] = index["vectors"][row] @ index["basis"]
+        placed[row] = True
+
+
+def build_index(frame):
+    """Index a full posting frame from scratch."""
+    index = {"titles": [], "title_ids": {}, "skills": [], "skill_ids": {}, "counts": sp.csr_matrix((0, 0)),
+             "planes": np.zeros((0, lsh_tables * lsh_bits), dtype=np.float32),
+             "centroids": np.zeros((n_clusters, 0), dtype=np.float32), "cluster_names": {}, "ingested_rows": 0}
+    _grow_skills(index, frame["skill"].dropna())
+    index["counts"] = _count_matrix(index, frame)
+    index["vectors"] = _weighted(index["counts"])
+    index["codes"] = _hash(index, index["vectors"])
+    _build_buckets(index)
+
+    # k-means++ seeding, then a few passes of online updates over a shuffled order
+    n = len(index["titles"])
+    rng = np.random.default_rng(seed)
+    chosen = [int(rng.integers(n))]
+    for _ in range(1, n_clusters):
+        distance = 1 - (index["vectors"] @ index["vectors"][chosen].T).max(axis=1).toarray().ravel()
+        distance = np.maximum(distance, 0) + 1e-12
+        chosen.append(int(rng.choice(n, p=distance / distance.sum())))
+    index["centroids"] = index["vectors"][chosen].toarray()
+    index["cluster_sizes"] = np.ones(n_clusters)
+    index["labels"] = np.full(n, -1, dtype=np.int32)
+    for _ in range(kmeans_passes):
+        _assign(index, rng.permutation(n))
+
+    # Initial layout: the top two singular directions of the title x skill matrix
+    u, s, vt = svds(index["vectors"].astype(np.float64), k=2)
+    index["embedding"] = (u * s).astype(np.float32)
+    index["basis"] = vt.T.astype(np.float32)
+    index["ingested_rows"] = len(frame)
+    return index
+
+
+def update_index(index, frame):
+    """Fold new posting rows into an index: changed titles are re-hashed and re-assigned, new titles are also
+    placed in the layout. Returns the rows that changed."""
+    _grow_skills(index, frame["skill"].dropna())
+    n_before = len(index["titles"])
+    added = _count_matrix(index, frame)
+    counts = index["counts"]
+    counts.resize(added.shape)
+    index["counts"] = (counts + added).tocsr()
+
+    changed = np.unique(added.nonzero()[0])
+    index["vectors"] = _weighted(index["counts"])  # row-wise, so only the changed rows differ
+
+    # Move changed titles to their new buckets
+    codes = np.vstack([index["codes"], np.zeros((len(index["titles"]) - n_before, lsh_tables), dtype=np.int64)])
+    new_codes = _hash(index, index["vectors"][changed])
+    for row, old, new in zip(changed, codes[changed], new_codes):
+        for table in range(lsh_tables):
+            if row < n_before:
+                index["buckets"][table][int(old[table])].remove(row)
+            index["buckets"][table].setdefault(int(new[table]), []).append(row)
+    codes[changed] = new_codes
+    index["codes"] = codes
+
+    index["labels"] = np.concatenate([index["labels"], np.full(len(index["titles"]) - n_before, -1, dtype=np.int32)])
+    index["embedding"] = np.vstack([index["embedding"],
+                                    np.full((len(index["titles"]) - n_before, 2), np.nan, dtype=np.float32)])
+    index["basis"] = np.vstack([index["basis"], np.zeros((len(index["skills"]) - len(index["basis"]), 2),
+                                                         dtype=np.float32)])
+    _assign(index, changed)
+    _place(index, changed[changed >= n_before])
+    index["ingested_rows"] += len(frame)
+    return changed
+
+
+def _query(index, vector, k):
+    """(row, cosine similarity) of the k nearest titles to a normalised sparse row vector."""
+    codes = _hash(index, vector)[0]
+    candidates = {row for table, code in enumerate(codes) for row in index["buckets"][table].get(int(code), ())}
+    if len(candidates) < k:  # sparse corner of the space: fall back to an exact scan
+        candidates = range(len(index["titles"]))
+    candidates = np.fromiter(candidates, dtype=np.int64)
+    scores = (index["vectors"][candidates] @ vector.T).toarray().ravel()
+    top = np.argsort(-scores)[:k]
+    return list(zip(candidates[top].tolist(), scores[top].tolist()))
+
+
+def similar_titles(index, title, k=10):
+    """The k titles whose skill profiles are closest to title's, with cosine similarities."""
+    row = index["title_ids"][title]
+    return [(index["titles"][other], score) for other, score in _query(index, index["vectors"][row], k + 1)
+            if other != row][:k]
+
+
+def similar_to_skills(index, skills, k=10):
+    """The k titles closest to a skill list, e.g. for a title not yet in the index."""
+    columns = [index["skill_ids"][skill] for skill in skills if skill in index["skill_ids"]]
+    if not columns:
+        return []
+    vector = _weighted(sp.csr_matrix((np.ones(len(columns)), ([0] * len(columns), columns)),
+                                     shape=(1, len(index["skills"]))))
+    return [(index["titles"][other], score) for other, score in _query(index, vector, k)]
+
+
+def cluster_top_skills(index, n=5):
+    """The n heaviest skills of each cluster centroid."""
+    return [[index["skills"][column] for column in np.argsort(-centroid)[:n]] for centroid in index["centroids"]]
+
+
+def cluster_labels(index):
+    """Display name of each cluster: its reviewed name, or its top three skills."""
+    top = cluster_top_skills(index, 3)
+    return [index["cluster_names"].get(str(cluster), " / ".join(top[cluster])) for cluster in range(n_clusters)]
+
+
+def name_clusters(index, names):
+    """Set display names, e.g. {0: "Maintenance & Technical Specialists", ...}."""
+    index["cluster_names"].update({str(cluster): name for cluster, name in names.items()})
+
+
+def save_index(index, directory=index_dir):
+    os.makedirs(directory, exist_ok=True)
+    sp.save_npz(os.path.join(directory, "counts.npz"), index["counts"])
+    sp.save_npz(os.path.join(directory, "vectors.npz"), index["vectors"])
+    np.savez(os.path.join(directory, "arrays.npz"), **{name: index[name] for name in (
+        "planes", "codes", "centroids", "cluster_sizes", "labels", "embedding", "basis")})
+    with open(os.path.join(directory, "vocabulary.json"), "w") as f:
+        json.dump({name: index[name] for name in ("titles", "skills", "cluster_names", "ingested_rows")}, f)
+
+
+def load_index(directory=index_dir):
+    """A saved index, or None if none has been built."""
+    if not os.path.exists(os.path.join(directory, "vocabulary.json")):
+        return None
+    with open(os.path.join(directory, "vocabulary.json")) as f:
+        index = json.load(f)
+    index["title_ids"] = {title: row for row, title in enumerate(index["titles"])}
+    index["skill_ids"] = {skill: column for column, skill in enumerate(index["skills"])}
+    index["counts"] = sp.load_npz(os.path.join(directory, "counts.npz")).tocsr()
+    index["vectors"] = sp.load_npz(os.path.join(directory, "vectors.npz")).tocsr()
+    with np.load(os.path.join(directory, "arrays.npz")) as arrays:
+        index.update({name: arrays[name] for name in arrays.files})
+    _build_buckets(index)
+    return index
+
+
+def refresh_index(path=postings_path, directory=index_dir):
+    """Update the saved index with the rows appended to the posting CSV since it was last indexed (building it
+    if there is none). Returns the index."""
+    index = load_index(directory)
+    if index is None:
+        index = build_index(read_postings(path))
+    else:
+        frame = read_postings(path, skip_rows=index["ingested_rows"])
+        if frame.empty:
+            return index
+        update_index(index, frame)
+    save_index(index, directory)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Job-title skill-similarity index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="index the posting scrape from scratch")
+    commands.add_parser("update", help="fold in postings appended since the last run")
+    similar = commands.add_parser("similar", help="titles with the most similar skill profiles")
+    similar.add_argument("title")
+    similar.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_index(read_postings())
+        save_index(index)
+    elif args.command == "update":
+        index = refresh_index()
+    else:
+        index = load_index()
+        if index is None:
+            parser.error("no index yet, run: python skill_index.py build")
+        if args.title not in index["title_ids"]:
+            parser.error(f"unknown title: {args.title}")
+        for title, score in similar_titles(index, args.title, args.k):
+            print(f"{score:.3f}  {title}")
+        raise SystemExit
+    print(f"{len(index['titles']):,} titles, {len(index['skills']):,} skills")
+    for label, skills in zip(cluster_labels(index), cluster_top_skills(index)):
+        print(f"{label}: {', '.join(skills)}")
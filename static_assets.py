@@ -0,0 +1,129 @@
+# Static asset serving: precompressed variants, content-hash URLs and conditional/range requests
+#
+# Dash's own responses (the page, layout, dependencies and callback replies, figures included) are gzipped on the fly.
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+from figure_store import compiled_dir, load_manifest
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year without revalidating
+immutable_max_age = 365 * 24 * 3600
+
+# Preferred first: brotli, then gzip
+encodings = (("br", ".br"), ("gzip", ".gz"))
+
+# Dynamic responses compressed by compress_response; smaller ones are not worth the CPU time
+compressed_mimetypes = ("application/json", "text/html", "text/plain")
+min_compressed_bytes = 1000
+response_compresslevel = 6
+
+# <name>.<12 hex digits>.<ext>, as produced by asset_url() and build_assets.py
+_fingerprinted = re.compile(r"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{12})(?P<ext>\.[^./]+)$")
+
+
+@lru_cache(maxsize=1024)
+def _content_hash(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(path):
+    stat = os.stat(path)
+    return _content_hash(path, stat.st_mtime_ns, stat.st_size)
+
+
+def send_asset(folder, filename, immutable=False):
+    """Send a file from folder, choosing a precompressed variant and answering If-None-Match / Range."""
+    path = safe_join(os.path.abspath(folder), filename)
+    if path is None:
+        abort(404)
+    if not os.path.isfile(path):
+        # Fingerprinted URL: strip the hash and serve the current file if it still matches
+        match = _fingerprinted.match(filename)
+        path = match and safe_join(os.path.abspath(folder), match["stem"] + match["ext"])
+        if not path or not os.path.isfile(path) or not content_hash(path).startswith(match["digest"]):
+            abort(404)
+        immutable = True
+
+    digest = content_hash(path)[:16]
+    serve_path, encoding = path, None
+    # Byte ranges refer to the identity representation, so ranged requests always get the raw file
+    if "Range" not in request.headers:
+        for name, ext in encodings:
+            if request.accept_encodings[name] and os.path.isfile(path + ext):
+                serve_path, encoding = path + ext, name
+                break
+
+    response = send_file(
+        serve_path,
+        mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        etag=f"{digest}-{encoding}" if encoding else digest,
+        conditional=True,
+        max_age=immutable_max_age if immutable else None,
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def compress_response(response):
+    """Gzip a generated response when the client accepts it (files from send_asset are already compressed)."""
+    if (response.direct_passthrough or response.status_code != 200 or "Content-Encoding" in response.headers
+            or response.mimetype not in compressed_mimetypes or not request.accept_encodings["gzip"]):
+        return response
+    payload = response.get_data()
+    if len(payload) < min_compressed_bytes:
+        return response
+    response.set_data(gzip.compress(payload, compresslevel=response_compresslevel, mtime=0))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    if response.get_etag()[0]:
+        # The ETag named the uncompressed body
+        etag, weak = response.get_etag()
+        response.set_etag(f"{etag}-gzip", weak)
+    return response
+
+
+def asset_url(folder, filename, url_prefix="/assets/"):
+    """Content-hash URL for a file in folder, e.g. /assets/style.3f2a9c1d0b7e.css."""
+    stem, ext = os.path.splitext(filename)
+    digest = content_hash(os.path.join(folder, filename))[:12]
+    return f"{url_prefix}{stem}.{digest}{ext}"
+
+
+def compiled_url(name):
+    """URL of a chart's compiled payload, or None if build_assets.py has not been run."""
+    entry = load_manifest().get(name)
+    return f"/compiled/{entry['file']}" if entry else None
+
+
+def register_static_assets(app):
+    """Serve the Dash assets folder and compiled payloads through send_asset, and gzip Dash's responses."""
+    server = app.server
+    server.after_request(compress_response)
+    assets_folder = app.config.assets_folder
+
+    # Dash registers the assets folder as a blueprint static folder; swap in our view for it
+    for rule in server.url_map.iter_rules():
+        if rule.endpoint.endswith("dash_assets.static"):
+            def serve_assets(filename):
+                # Dash appends ?m=<mtime> to the scripts and stylesheets it links, which also versions the URL
+                return send_asset(assets_folder, filename, immutable="m" in request.args)
+            server.view_functions[rule.endpoint] = serve_assets
+
+    @server.route("/compiled/<path:filename>")
+    def serve_compiled(filename):
+        return send_asset(compiled_dir, filename, immutable=bool(_fingerprinted.match(filename)))